@@ -0,0 +1,42 @@
+"""book changes
+
+Revision ID: 2b9e5f7a1c38
+Revises: 7d3f1b8e2c46
+Create Date: 2026-10-18 17:42:06.318254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9e5f7a1c38'
+down_revision: Union[str, Sequence[str], None] = '7d3f1b8e2c46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_changes',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('operation', sa.String(), nullable=False),
+    sa.Column('transaction_id', sa.BigInteger(), server_default=sa.text('pg_current_xact_id()::text::bigint'), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_book_changes_feed', 'book_changes', ['transaction_id', 'id'], unique=False)
+    # Existing books become inserts, so a consumer starting without a cursor receives the whole catalog.
+    op.execute(
+        "INSERT INTO book_changes (book_id, operation) "
+        "SELECT id, 'insert' FROM books ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_changes_feed', table_name='book_changes')
+    op.drop_table('book_changes')
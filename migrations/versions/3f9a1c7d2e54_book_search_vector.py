@@ -0,0 +1,49 @@
+"""book search vector
+
+Revision ID: 3f9a1c7d2e54
+Revises: cf3df11ee344
+Create Date: 2026-10-18 10:12:41.318502
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9a1c7d2e54'
+down_revision: Union[str, Sequence[str], None] = 'cf3df11ee344'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column('books', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+    op.execute("""
+        UPDATE books SET search_vector =
+            setweight(to_tsvector('simple', books.title), 'A')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(authors.name || ' ' || authors.surname, ' ')
+                FROM book_authors JOIN authors ON authors.id = book_authors.author_id
+                WHERE book_authors.book_id = books.id), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce((
+                SELECT string_agg(genres.name, ' ')
+                FROM book_genres JOIN genres ON genres.id = book_genres.genre_id
+                WHERE book_genres.book_id = books.id), '')), 'B')
+            || setweight(to_tsvector('simple', coalesce(books.description, '')), 'C')
+    """)
+    op.create_index('ix_books_search_vector', 'books', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_books_title_trgm', 'books', ['title'], unique=False, postgresql_using='gin',
+                    postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_title_trgm', table_name='books', postgresql_using='gin',
+                  postgresql_ops={'title': 'gin_trgm_ops'})
+    op.drop_index('ix_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
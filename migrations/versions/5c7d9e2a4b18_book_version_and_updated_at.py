@@ -0,0 +1,31 @@
+"""book version and updated_at
+
+Revision ID: 5c7d9e2a4b18
+Revises: 8b2e6d4f1a93
+Create Date: 2026-10-18 12:27:09.104716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7d9e2a4b18'
+down_revision: Union[str, Sequence[str], None] = '8b2e6d4f1a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('books', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'),
+                                     nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'updated_at')
+    op.drop_column('books', 'version')
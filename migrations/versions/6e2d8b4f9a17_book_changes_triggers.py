@@ -0,0 +1,70 @@
+"""book changes triggers
+
+Revision ID: 6e2d8b4f9a17
+Revises: 9c4e1a7f3b52
+Create Date: 2026-10-18 20:11:43.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2d8b4f9a17'
+down_revision: Union[str, Sequence[str], None] = '9c4e1a7f3b52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The feed is written by the database in the writer's transaction, so it also covers books written by
+    # the importer, seed scripts or plain SQL. Updates that only refresh search_vector are not changes.
+    op.execute("""
+        CREATE FUNCTION books_record_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                INSERT INTO book_changes (book_id, operation)
+                SELECT changed.id, 'update' FROM changed JOIN previous ON previous.id = changed.id
+                WHERE (changed.title, changed.description, changed.version)
+                    IS DISTINCT FROM (previous.title, previous.description, previous.version)
+                ORDER BY changed.id;
+            ELSE
+                INSERT INTO book_changes (book_id, operation)
+                SELECT id, lower(TG_OP) FROM changed ORDER BY id;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_changes_insert AFTER INSERT ON books
+        REFERENCING NEW TABLE AS changed
+        FOR EACH STATEMENT EXECUTE FUNCTION books_record_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_changes_update AFTER UPDATE ON books
+        REFERENCING OLD TABLE AS previous NEW TABLE AS changed
+        FOR EACH STATEMENT EXECUTE FUNCTION books_record_changes()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_changes_delete AFTER DELETE ON books
+        REFERENCING OLD TABLE AS changed
+        FOR EACH STATEMENT EXECUTE FUNCTION books_record_changes()
+    """)
+    # Books written without record_book_changes (e.g. by scripts.seed_books) are missing from the feed.
+    op.execute(
+        "INSERT INTO book_changes (book_id, operation) "
+        "SELECT id, 'insert' FROM books "
+        "WHERE NOT EXISTS (SELECT 1 FROM book_changes WHERE book_changes.book_id = books.id) ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER books_changes_delete ON books")
+    op.execute("DROP TRIGGER books_changes_update ON books")
+    op.execute("DROP TRIGGER books_changes_insert ON books")
+    op.execute("DROP FUNCTION books_record_changes()")
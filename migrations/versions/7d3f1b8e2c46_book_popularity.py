@@ -0,0 +1,39 @@
+"""book popularity
+
+Revision ID: 7d3f1b8e2c46
+Revises: e4a7c2b9d615
+Create Date: 2026-10-18 15:11:52.930417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3f1b8e2c46'
+down_revision: Union[str, Sequence[str], None] = 'e4a7c2b9d615'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('book_popularity',
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('favorites', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('book_id')
+    )
+    op.create_index('ix_book_popularity_rank', 'book_popularity', ['favorites', 'book_id'], unique=False)
+    op.execute(
+        "INSERT INTO book_popularity (book_id, favorites) "
+        "SELECT book_id, count(*) FROM user_books GROUP BY book_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_book_popularity_rank', table_name='book_popularity')
+    op.drop_table('book_popularity')
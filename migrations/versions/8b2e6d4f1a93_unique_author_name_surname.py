@@ -0,0 +1,43 @@
+"""unique author name and surname
+
+Revision ID: 8b2e6d4f1a93
+Revises: 3f9a1c7d2e54
+Create Date: 2026-10-18 11:04:17.552930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e6d4f1a93'
+down_revision: Union[str, Sequence[str], None] = '3f9a1c7d2e54'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Merge duplicate authors into the oldest row before the constraint can be created.
+    op.execute("""
+        INSERT INTO book_authors (author_id, book_id)
+        SELECT keep.id, book_authors.book_id
+        FROM book_authors
+        JOIN authors ON authors.id = book_authors.author_id
+        JOIN (SELECT min(id) AS id, name, surname FROM authors GROUP BY name, surname) AS keep
+            ON keep.name = authors.name AND keep.surname = authors.surname
+        WHERE authors.id <> keep.id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        DELETE FROM authors USING authors AS duplicate
+        WHERE authors.name = duplicate.name AND authors.surname = duplicate.surname AND authors.id > duplicate.id
+    """)
+    op.create_unique_constraint('uq_authors_name_surname', 'authors', ['name', 'surname'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_authors_name_surname', 'authors', type_='unique')
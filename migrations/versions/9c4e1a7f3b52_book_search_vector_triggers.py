@@ -0,0 +1,86 @@
+"""book search vector triggers
+
+Revision ID: 9c4e1a7f3b52
+Revises: 2b9e5f7a1c38
+Create Date: 2026-10-18 19:05:27.614093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e1a7f3b52'
+down_revision: Union[str, Sequence[str], None] = '2b9e5f7a1c38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # search_vector is maintained by the database, so every writer (the API, the importer, seed scripts, plain
+    # SQL) keeps it in sync. Arguments are positional because column names shadow parameter names in SQL functions.
+    op.execute("""
+        CREATE FUNCTION book_search_vector(integer, text, text) RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('simple', coalesce($2, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(authors.name || ' ' || authors.surname, ' ')
+                    FROM book_authors JOIN authors ON authors.id = book_authors.author_id
+                    WHERE book_authors.book_id = $1), '')), 'B')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(genres.name, ' ')
+                    FROM book_genres JOIN genres ON genres.id = book_genres.genre_id
+                    WHERE book_genres.book_id = $1), '')), 'B')
+                || setweight(to_tsvector('simple', coalesce($3, '')), 'C')
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION books_set_search_vector() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.search_vector := book_search_vector(NEW.id, NEW.title, NEW.description);
+            RETURN NEW;
+        END
+        $$
+    """)
+    # Statement level, so linking the authors and genres of a whole import batch recomputes each book once.
+    op.execute("""
+        CREATE FUNCTION books_refresh_linked_search_vectors() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE books SET search_vector = book_search_vector(books.id, books.title, books.description)
+            WHERE books.id IN (SELECT book_id FROM changed);
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_search_vector BEFORE INSERT OR UPDATE OF title, description ON books
+        FOR EACH ROW EXECUTE FUNCTION books_set_search_vector()
+    """)
+    for table in ('book_authors', 'book_genres'):
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION books_refresh_linked_search_vectors()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION books_refresh_linked_search_vectors()
+        """)
+    # Books written without refresh_search_vectors (e.g. by scripts.seed_books) were never indexed.
+    op.execute("UPDATE books SET search_vector = book_search_vector(id, title, description)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('book_authors', 'book_genres'):
+        op.execute(f"DROP TRIGGER {table}_search_vector_delete ON {table}")
+        op.execute(f"DROP TRIGGER {table}_search_vector_insert ON {table}")
+    op.execute("DROP TRIGGER books_search_vector ON books")
+    op.execute("DROP FUNCTION books_refresh_linked_search_vectors()")
+    op.execute("DROP FUNCTION books_set_search_vector()")
+    op.execute("DROP FUNCTION book_search_vector(integer, text, text)")
@@ -0,0 +1,40 @@
+"""book side association indexes
+
+Revision ID: e4a7c2b9d615
+Revises: 5c7d9e2a4b18
+Create Date: 2026-10-18 14:02:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c2b9d615'
+down_revision: Union[str, Sequence[str], None] = '5c7d9e2a4b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_book_authors_book_id', 'book_authors'),
+    ('ix_book_genres_book_id', 'book_genres'),
+    ('ix_user_books_book_id', 'user_books'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The composite primary keys lead with author_id/genre_id/user_id, so lookups and ON DELETE CASCADE by
+    # book_id scan the whole table. Build concurrently so writes are not blocked on large catalogs.
+    with op.get_context().autocommit_block():
+        for name, table in INDEXES:
+            op.create_index(name, table, ['book_id'], unique=False, postgresql_concurrently=True,
+                            if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,219 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.http_client import HttpClient, HttpResponse, percentile
+from scripts.seed_books import USER_EMAIL, USER_PASSWORD
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "local.json")
+STATEMENTS = re.compile(r'desc="statements=(\d+)"')
+# Slack allowed against the baseline before a scenario is reported as a regression; queries/request only
+# tolerates rounding, any real extra statement counts.
+LATENCY_TOLERANCE = 0.15
+THROUGHPUT_TOLERANCE = 0.15
+QUERIES_TOLERANCE = 0.01
+RATE_LIMITED_HINT = "start the server with RATE_LIMIT_BACKEND=none (make serve.bench)"
+
+
+@dataclass
+class Context:
+    rng: random.Random
+    min_book_id: int
+    max_book_id: int
+    tokens: list[str]
+    admin_token: str
+    cursors: list[str | None] = field(default_factory=lambda: [None])
+
+    def book_id(self) -> int:
+        return self.rng.randint(self.min_book_id, self.max_book_id)
+
+    def user_headers(self) -> dict[str, str]:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+
+Scenario = Callable[[HttpClient, Context], Awaitable[HttpResponse]]
+
+
+async def list_paging(client: HttpClient, ctx: Context) -> HttpResponse:
+    # Walk forward through the catalog, restarting from the first page once the end is reached.
+    cursor = ctx.cursors.pop() if ctx.cursors else None
+    response = await client.get("/api/books", params={"limit": 50, **({"cursor": cursor} if cursor else {})})
+    if response.status == 200:
+        ctx.cursors.append(response.json()["next_cursor"])
+    return response
+
+
+async def search(client: HttpClient, ctx: Context) -> HttpResponse:
+    # Seeded titles are "Book <n> <hex>", numbered from zero.
+    number = ctx.rng.randrange(ctx.max_book_id - ctx.min_book_id + 1)
+    return await client.get("/api/books/search", params={"q": f"Book {number}"})
+
+
+async def book_by_id(client: HttpClient, ctx: Context) -> HttpResponse:
+    return await client.get(f"/api/books/{ctx.book_id()}")
+
+
+async def login(client: HttpClient, ctx: Context) -> HttpResponse:
+    email = USER_EMAIL.format(ctx.rng.randrange(len(ctx.tokens)))
+    return await client.post("/api/auth/login", form={"username": email, "password": USER_PASSWORD})
+
+
+async def favorite_toggle(client: HttpClient, ctx: Context) -> HttpResponse:
+    book_id = ctx.book_id()
+    headers = ctx.user_headers()
+    if ctx.rng.random() < 0.5:
+        return await client.post("/api/books/favorite", params={"book_id": book_id}, headers=headers)
+    return await client.delete(f"/api/books/favorite/{book_id}", headers=headers)
+
+
+async def csv_export(client: HttpClient, ctx: Context) -> HttpResponse:
+    return await client.get("/api/books/csv", headers={"Authorization": f"Bearer {ctx.admin_token}"})
+
+
+SCENARIOS: dict[str, tuple[Scenario, int]] = {
+    # name: (scenario, default concurrency)
+    "list": (list_paging, 20),
+    "search": (search, 20),
+    "book": (book_by_id, 20),
+    "login": (login, 10),
+    "favorite": (favorite_toggle, 20),
+    "csv": (csv_export, 2),
+}
+
+
+async def run_scenario(client: HttpClient, ctx: Context, scenario: Scenario, concurrency: int,
+                       seconds: float) -> dict:
+    latencies: list[float] = []
+    statements: list[int] = []
+    errors = 0
+    limited = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors, limited
+        while time.perf_counter() < deadline:
+            response = await scenario(client, ctx)
+            latencies.append(response.elapsed * 1000)
+            if response.status == 429:
+                limited += 1
+            elif response.status >= 400:
+                errors += 1
+            match = STATEMENTS.search(response.headers.get("server-timing", ""))
+            if match:
+                statements.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "limited": limited,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "queries": sum(statements) / len(statements) if statements else None,
+    }
+
+
+async def prepare(client: HttpClient, users: int, seed: int) -> Context:
+    total = (await client.get("/api/books/facets", params={"limit": 1})).json()["total"]
+    if not total:
+        raise SystemExit("The catalog is empty, run `make seed` first.")
+    first = (await client.get("/api/books", params={"limit": 1, "offset": 0})).json()[0]["id"]
+    last = (await client.get("/api/books", params={"limit": 1, "offset": total - 1})).json()[0]["id"]
+
+    tokens = []
+    for i in range(users):
+        login_response = await client.post("/api/auth/login",
+                                           form={"username": USER_EMAIL.format(i), "password": USER_PASSWORD})
+        if login_response.status == 429:
+            raise SystemExit(f"Logins are rate limited, {RATE_LIMITED_HINT}.")
+        if login_response.status != 200:
+            raise SystemExit(f"Could not log in as {USER_EMAIL.format(i)}, seed users with `make seed`.")
+        tokens.append(login_response.json()["access_token"])
+    return Context(random.Random(seed), first, last, tokens, tokens[0])
+
+
+def report(results: dict[str, dict], baseline: dict[str, dict] | None) -> list[str]:
+    regressions = []
+    print(f"{'scenario':<10} {'req':>7} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'queries':>8}")
+    for name, result in results.items():
+        queries = f"{result['queries']:.2f}" if result["queries"] is not None else "-"
+        print(f"{name:<10} {result['requests']:>7} {result['errors']:>5} {result['throughput']:>9.1f} "
+              f"{result['p50']:>9.1f} {result['p95']:>9.1f} {result['p99']:>9.1f} {queries:>8}")
+        before = (baseline or {}).get(name)
+        if before is None:
+            continue
+        print(f"{'':<10} vs baseline: req/s {before['throughput']:.1f}, p95 {before['p95']:.1f}ms, "
+              f"queries {before['queries'] if before['queries'] is not None else '-'}")
+        if result["p95"] > before["p95"] * (1 + LATENCY_TOLERANCE):
+            regressions.append(f"{name}: p95 {before['p95']:.1f}ms -> {result['p95']:.1f}ms")
+        if result["throughput"] < before["throughput"] * (1 - THROUGHPUT_TOLERANCE):
+            regressions.append(f"{name}: throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+        if None not in (result["queries"], before["queries"]) and \
+                result["queries"] > before["queries"] + QUERIES_TOLERANCE:
+            regressions.append(f"{name}: queries/request {before['queries']:.2f} -> {result['queries']:.2f}")
+    return regressions
+
+
+async def main(base_url: str, scenarios: list[str], seconds: float, concurrency: int | None, users: int,
+               seed: int, baseline_path: str, save: bool) -> int:
+    client = HttpClient(base_url)
+    ctx = await prepare(client, users, seed)
+
+    results = {}
+    for name in scenarios:
+        scenario, default_concurrency = SCENARIOS[name]
+        print(f"Running {name} for {seconds:.0f}s...")
+        results[name] = await run_scenario(client, ctx, scenario, concurrency or default_concurrency, seconds)
+
+    limited = {name: result["limited"] for name, result in results.items() if result["limited"]}
+    if limited:
+        # 429s are cheap and fast, so any figure measured alongside them is meaningless.
+        for name, count in limited.items():
+            print(f"ERROR {name}: {count} responses were rate limited (429)")
+        print(f"Results are not comparable and were not saved; {RATE_LIMITED_HINT}.")
+        return 2
+
+    baseline = None
+    if os.path.exists(baseline_path) and not save:
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+    regressions = report(results, baseline)
+
+    if save:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run API load scenarios and compare them with a stored baseline.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:3000")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run, repeat for several (default: all).")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, help="Override the per-scenario default.")
+    parser.add_argument("--users", type=int, default=10, help="Seeded users to log in as.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Store this run as the new baseline.")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.base_url, args.scenario or list(SCENARIOS), args.seconds, args.concurrency,
+                              args.users, args.seed, args.baseline, args.save)))
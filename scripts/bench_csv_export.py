@@ -0,0 +1,54 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, func
+from src.book.model import Book
+from src.book.service import load_books_to_csv, stream_books_csv
+from src.db.database import session_maker
+
+
+async def run_buffered() -> int:
+    async with session_maker() as session:
+        return len(await load_books_to_csv(session))
+
+
+async def run_streaming(batch_size: int) -> int:
+    size = 0
+    async with session_maker() as session:
+        async for chunk in stream_books_csv(session, batch_size):
+            size += len(chunk)
+    return size
+
+
+async def measure(name: str, coro) -> None:
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = await coro
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {elapsed:8.2f}s  peak {peak / 1024 / 1024:8.1f} MiB  output {size / 1024 / 1024:8.1f} MiB")
+
+
+async def main(batch_size: int, skip_buffered: bool):
+    async with session_maker() as session:
+        books = await session.scalar(select(func.count(Book.id)))
+    print(f"Exporting {books} books (batch size {batch_size})")
+
+    await measure("streaming", run_streaming(batch_size))
+    if not skip_buffered:
+        await measure("buffered", run_buffered())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare peak memory of buffered and streaming CSV export.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--skip-buffered", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.skip_buffered))
@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scripts.http_client import HttpClient, percentile
+
+EMAIL = "login-storm@example.com"
+PASSWORD = "login-storm-password"
+
+
+async def probe(client: HttpClient, path: str, stop: asyncio.Event, latencies: list[float]) -> None:
+    while not stop.is_set():
+        response = await client.get(path)
+        latencies.append(response.elapsed * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def login_worker(client: HttpClient, stop: asyncio.Event, statuses: dict[int, int]) -> None:
+    while not stop.is_set():
+        response = await client.post("/api/auth/login", form={"username": EMAIL, "password": PASSWORD})
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+
+
+async def measure_probe(client: HttpClient, path: str, seconds: float, logins: int) -> tuple[list[float], dict]:
+    stop = asyncio.Event()
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    tasks = [asyncio.create_task(probe(client, path, stop, latencies))]
+    tasks += [asyncio.create_task(login_worker(client, stop, statuses)) for _ in range(logins)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, statuses
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(f"{name:<14} n={len(latencies):<6} p50={percentile(latencies, 50):8.1f}ms "
+          f"p95={percentile(latencies, 95):8.1f}ms p99={percentile(latencies, 99):8.1f}ms")
+
+
+async def main(base_url: str, probe_path: str, seconds: float, logins: int) -> int:
+    client = HttpClient(base_url)
+    await client.post("/api/auth/register", json_body={"email": EMAIL, "password": PASSWORD})
+
+    baseline, _ = await measure_probe(client, probe_path, seconds, 0)
+    storm, statuses = await measure_probe(client, probe_path, seconds, logins)
+
+    print(f"Probe {probe_path}, {logins} concurrent logins for {seconds:.0f}s")
+    report("idle", baseline)
+    report("login storm", storm)
+    print(f"login responses: {dict(sorted(statuses.items()))}")
+    if statuses.get(429):
+        # Rejected logins never reach argon2, so the storm did not load the hash pool.
+        print(f"ERROR: {statuses[429]} logins were rate limited (429), the storm figures are meaningless; "
+              f"start the server with RATE_LIMIT_BACKEND=none (make serve.bench).")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency of an unrelated endpoint while logins hammer argon2.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:3000")
+    parser.add_argument("--probe", default="/api/books?limit=1&offset=0")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.base_url, args.probe, args.seconds, args.logins)))
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, func
+from src.book.model import Book
+from src.book.service import get_all_books, get_books_page, encode_cursor
+from src.db.database import session_maker
+
+
+async def timed(coro_factory, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await coro_factory()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def main(limit: int, repeat: int):
+    async with session_maker() as session:
+        total = await session.scalar(select(func.count(Book.id)))
+        print(f"{total} books, page size {limit}, median of {repeat} runs")
+        print(f"{'offset':>10} {'offset ms':>12} {'keyset ms':>12}")
+
+        offset = 0
+        while offset < total:
+            # The keyset cursor for page N is the id of the last row of page N - 1.
+            last_id = await session.scalar(select(Book.id).order_by(Book.id).offset(offset - 1).limit(1)) \
+                if offset else None
+            cursor = encode_cursor(last_id) if last_id is not None else None
+
+            offset_ms = await timed(lambda: get_all_books(limit, offset, session), repeat)
+            keyset_ms = await timed(lambda: get_books_page(limit, cursor, session), repeat)
+            print(f"{offset:>10} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+            session.expunge_all()
+            offset = offset * 10 if offset else 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare OFFSET and keyset pagination at growing offsets.")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.limit, args.repeat))
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import sys
+import timeit
+from collections import namedtuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.book.model import Book, Author, Genre
+from src.book.schema import BookResponse
+from src.book.service import book_row_to_dict
+from src.responses import FastJSONResponse
+
+BookRow = namedtuple("BookRow", ["id", "title", "description", "version", "authors", "genres"])
+
+
+def make_books(count: int) -> list[Book]:
+    genres = [Genre(id=i, name=f"Genre{i}") for i in range(10)]
+    return [
+        Book(id=i, title=f"Book {i}", description=f"Description of book {i}", version=1,
+             authors=[Author(id=i * 3 + j, name=f"Name{j}", surname=f"Surname{i}") for j in range(3)],
+             genres=genres[i % 8:i % 8 + 2])
+        for i in range(count)
+    ]
+
+
+def make_rows(books: list[Book]) -> list[BookRow]:
+    return [BookRow(book.id, book.title, book.description, book.version,
+                    [author.fullname for author in book.authors], [genre.name for genre in book.genres])
+            for book in books]
+
+
+def orm_path(books: list[Book], adapter: TypeAdapter) -> bytes:
+    # What the route did before: validate from ORM objects, let FastAPI re-validate against response_model,
+    # then encode with jsonable_encoder and the standard JSONResponse.
+    content = [BookResponse.model_validate(book) for book in books]
+    validated = adapter.validate_python(content)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def lean_path(rows: list[BookRow]) -> bytes:
+    return FastJSONResponse([book_row_to_dict(row) for row in rows]).body
+
+
+def main(page_size: int, number: int):
+    books = make_books(page_size)
+    rows = make_rows(books)
+    adapter = TypeAdapter(list[BookResponse])
+    assert json.loads(orm_path(books, adapter)) == json.loads(lean_path(rows))
+
+    orm = timeit.timeit(lambda: orm_path(books, adapter), number=number) / number * 1000
+    lean = timeit.timeit(lambda: lean_path(rows), number=number) / number * 1000
+    print(f"Page of {page_size} books, {number} iterations")
+    print(f"ORM + response_model: {orm:8.3f} ms/page")
+    print(f"rows + fast JSON:     {lean:8.3f} ms/page  ({orm / lean:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the ORM and row-based BookResponse serialization paths.")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    main(args.page_size, args.number)
@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, select
+
+from src.auth.security import create_access_token
+from src.auth.user_cache import cache_principal
+from src.book.model import Book, Author, Genre
+from src.cache import response_cache
+from src.db.database import engine, replicas, session_maker
+from src.main import app
+from src.user.model import User
+from src.user.service import get_user_principal
+
+
+@dataclass
+class Case:
+    method: str
+    path: str
+    budget: int
+    params: dict = field(default_factory=dict)
+    headers: dict[str, str] = field(default_factory=dict)
+    body: dict | None = None
+
+
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self.statements: list[str] = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(" ".join(statement.split())[:160])
+
+    def reset(self):
+        self.count = 0
+        self.statements.clear()
+
+
+async def call(method: str, path: str, params: dict, headers: dict[str, str],
+               body: dict | None = None) -> tuple[int, bytes]:
+    # Drive the ASGI app in-process so only the statements issued by the endpoint itself are counted.
+    if body is not None:
+        headers = {**headers, "Content-Type": "application/json"}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params).encode(), "server": ("testserver", 80), "client": ("127.0.0.1", 0),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+    }
+    received = False
+    status = 0
+    response_body = b""
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": json.dumps(body).encode() if body is not None else b"",
+                "more_body": False}
+
+    async def send(message):
+        nonlocal status, response_body
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            response_body += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return status, response_body
+
+
+async def main(verbose: bool) -> int:
+    # Open the first connection of every pool up front so dialect initialization is not counted.
+    for replica in replicas.engines:
+        async with replica.connect():
+            pass
+    counter = StatementCounter()
+    for target in [engine, *replicas.engines]:
+        event.listen(target.sync_engine, "before_cursor_execute", counter)
+    # Every request must reach the database, otherwise a cache hit would hide an N+1.
+    response_cache.backend = None
+
+    async with engine.connect() as conn:
+        user_id = (await conn.execute(select(User.id).order_by(User.id).limit(1))).scalar()
+        book_id = (await conn.execute(select(Book.id).order_by(Book.id).limit(1))).scalar()
+        genre = (await conn.execute(select(Genre.name).limit(1))).scalar()
+        author = (await conn.execute(select(Author.name + " " + Author.surname).limit(1))).scalar()
+    if user_id is None or book_id is None or genre is None or author is None:
+        print("Seed at least one user and one book first (make seed).")
+        return 1
+
+    # Without a shared revocation store the role is looked up once per USER_CACHE_TTL_SECONDS; do it up front.
+    async with session_maker() as session:
+        cache_principal(await get_user_principal(user_id, session))
+    auth = {"Authorization": f"Bearer {create_access_token({'id': user_id, 'role': 'admin'})}"}
+    new_book = {"title": "Query budget", "description": "Created by check_query_budget.", "authors": [author],
+                "genres": [genre]}
+    cases = [
+        Case("GET", "/api/books", 1, {"limit": 50, "offset": 0}),
+        Case("GET", "/api/books", 1, {"limit": 50}),
+        Case("GET", "/api/books", 1, {"limit": 50, "genre": genre, "author": author}),
+        Case("GET", "/api/books/facets", 1, {"genre": genre}),
+        Case("GET", "/api/books/popular", 1, {"limit": 50}),
+        Case("GET", "/api/books", 1, {"ids": ",".join(str(book_id + i) for i in range(20))}),
+        Case("GET", f"/api/books/{book_id}", 1),
+        # A stale validator costs the version probe plus the full load.
+        Case("GET", f"/api/books/{book_id}", 2, headers={"If-None-Match": f'W/"book-{book_id}-0"'}),
+        Case("GET", "/api/books/search", 1, {"q": "the", "limit": 20}),
+        Case("GET", "/api/books/csv", 1, headers=auth),
+        Case("GET", "/api/books/changes", 1, {"limit": 100}, auth),
+        Case("POST", "/api/books/favorite", 2, {"book_id": book_id}, auth),
+        Case("GET", "/api/books/favorites", 1, headers=auth),
+        Case("GET", "/api/books/favorites/expanded", 1, {"limit": 50}, auth),
+        Case("DELETE", f"/api/books/favorite/{book_id}", 2, headers=auth),
+        # {created} is the book created by the POST case, so the writes leave the catalog as they found it.
+        # Author and genre lookups, the book, one INSERT per association table.
+        Case("POST", "/api/books", 5, headers=auth, body=new_book),
+        # Load, UPDATE, the fetch of the SQL-computed version and updated_at, the refresh for the response.
+        Case("PUT", "/api/books/{created}", 4, headers=auth, body={"title": "Query budget, updated"}),
+        # Load, one DELETE per loaded association table, the book.
+        Case("DELETE", "/api/books/{created}", 4, headers=auth),
+    ]
+
+    failures = 0
+    created = None
+    for case in cases:
+        path = case.path.format(created=created)
+        counter.reset()
+        status, body = await call(case.method, path, case.params, case.headers, case.body)
+        if case.body is new_book and status == 200:
+            created = json.loads(body)["id"]
+        over = counter.count > case.budget
+        failures += over
+        label = f"{case.method} {path}" + (f"?{urlencode(case.params)}" if case.params else "")
+        print(f"{'FAIL' if over else 'ok':<4} {counter.count}/{case.budget} statements  {status}  {label[:90]}")
+        if over or verbose:
+            for statement in counter.statements:
+                print(f"       {statement}")
+
+    print(f"{len(cases) - failures}/{len(cases)} endpoints within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail if a book endpoint issues more statements than its budget.")
+    parser.add_argument("--verbose", action="store_true", help="Print the statements of every endpoint.")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.verbose)))
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select, func, text, tuple_, delete
+from sqlalchemy.dialects import postgresql
+
+from src.book.model import Book, Author, Genre, book_authors, book_genres
+from src.book.service import book_query, BookLoading
+from src.db.database import session_maker
+from src.user.model import user_books
+
+# Indexes and constraints that back book-side and name lookups. They are dropped inside a transaction that is
+# always rolled back, so the schema is left untouched (but the tables are locked while the script runs).
+DROP_STATEMENTS = [
+    "DROP INDEX ix_book_authors_book_id",
+    "DROP INDEX ix_book_genres_book_id",
+    "DROP INDEX ix_user_books_book_id",
+    "ALTER TABLE authors DROP CONSTRAINT uq_authors_name_surname",
+    "ALTER TABLE genres DROP CONSTRAINT genres_name_key",
+]
+
+
+def queries(book_id: int, author: tuple[str, str], genre: str) -> list[tuple[str, object, bool]]:
+    return [
+        ("authors of a book", select(book_authors.c.author_id).where(book_authors.c.book_id == book_id), True),
+        ("genres of a book", select(book_genres.c.genre_id).where(book_genres.c.book_id == book_id), True),
+        ("users favoriting a book", select(user_books.c.user_id).where(user_books.c.book_id == book_id), True),
+        ("aggregated book page", book_query(BookLoading.AGGREGATED).order_by(Book.id).limit(50), True),
+        ("author by name", select(Author.id).where(tuple_(Author.name, Author.surname).in_([author])), True),
+        ("genre by name", select(Genre.id).where(Genre.name.in_([genre])), True),
+        # Plain EXPLAIN: ANALYZE would execute the delete.
+        ("delete a book", delete(Book).where(Book.id == book_id), False),
+    ]
+
+
+def render(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def explain(session, statement, analyze: bool) -> list[str]:
+    options = "ANALYZE, BUFFERS, COSTS OFF" if analyze else "COSTS OFF"
+    result = await session.execute(text(f"EXPLAIN ({options}) {render(statement)}"))
+    return [line for line, in result]
+
+
+async def report(session, title: str, cases: list[tuple[str, object, bool]]) -> None:
+    print(f"===== {title} =====")
+    for label, statement, analyze in cases:
+        print(f"--- {label}")
+        for line in await explain(session, statement, analyze):
+            print(f"    {line}")
+
+
+async def main():
+    async with session_maker() as session:
+        total = await session.scalar(select(func.count(Book.id)))
+        print(f"{total} books, {await session.scalar(select(func.count()).select_from(book_authors))} "
+              f"book_authors rows, {await session.scalar(select(func.count()).select_from(user_books))} "
+              f"user_books rows")
+        book_id = await session.scalar(select(Book.id).order_by(Book.id).offset(total // 2).limit(1))
+        author = (await session.execute(select(Author.name, Author.surname).limit(1))).one()
+        genre = await session.scalar(select(Genre.name).limit(1))
+        if book_id is None or genre is None:
+            print("Seed the database first, e.g. python -m scripts.seed_books --books 1000000")
+            return
+        cases = queries(book_id, tuple(author), genre)
+
+        await report(session, "with indexes", cases)
+        for statement in DROP_STATEMENTS:
+            await session.execute(text(statement))
+        await report(session, "without indexes", cases)
+        await session.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Print query plans for book-side lookups with and without the association indexes."
+    )
+    parser.parse_args()
+    asyncio.run(main())
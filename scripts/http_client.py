@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit, urlencode
+
+
+@dataclass
+class HttpResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    elapsed: float = 0.0
+
+    def json(self):
+        return json.loads(self.body)
+
+
+@dataclass
+class HttpClient:
+    base_url: str
+    timeout: float = 30.0
+    default_headers: dict[str, str] = field(default_factory=dict)
+
+    async def request(self, method: str, path: str, *, params: dict | None = None, json_body=None,
+                      form: dict | None = None, headers: dict[str, str] | None = None) -> HttpResponse:
+        url = urlsplit(self.base_url)
+        target = path + (f"?{urlencode(params, doseq=True)}" if params else "")
+        body = b""
+        request_headers = {"Host": url.netloc, "Connection": "close", **self.default_headers, **(headers or {})}
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            request_headers["Content-Type"] = "application/json"
+        elif form is not None:
+            body = urlencode(form).encode()
+            request_headers["Content-Type"] = "application/x-www-form-urlencoded"
+        request_headers["Content-Length"] = str(len(body))
+
+        started = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(url.hostname, url.port or 80), self.timeout
+        )
+        try:
+            head = f"{method} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in request_headers.items())
+            writer.write(head.encode() + b"\r\n" + body)
+            await writer.drain()
+            raw = await asyncio.wait_for(reader.read(), self.timeout)
+        finally:
+            writer.close()
+        elapsed = time.perf_counter() - started
+
+        head, _, payload = raw.partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        response_headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if response_headers.get("transfer-encoding") == "chunked":
+            payload = _decode_chunked(payload)
+        return HttpResponse(int(status_line.split()[1]), response_headers, payload, elapsed)
+
+    async def get(self, path: str, **kwargs) -> HttpResponse:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs) -> HttpResponse:
+        return await self.request("POST", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs) -> HttpResponse:
+        return await self.request("DELETE", path, **kwargs)
+
+
+def _decode_chunked(payload: bytes) -> bytes:
+    body = bytearray()
+    while payload:
+        size_line, _, payload = payload.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        body += payload[:size]
+        payload = payload[size + 2:]
+    return bytes(body)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,18 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.book.service import rebuild_popularity
+from src.db.database import session_maker
+
+
+async def main():
+    async with session_maker() as session:
+        total = await rebuild_popularity(session)
+    print(f"Popularity rebuilt, {total} books have at least one favorite")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import insert
+from src.auth.security import get_password_hash
+from src.book.model import Book, Author, Genre, book_authors, book_genres
+from src.book.service import rebuild_popularity
+from src.db.database import session_maker
+from src.user.model import User, UserRole, user_books
+
+BATCH_SIZE = 5000
+# Shared with the benchmark scenarios, which log in as the seeded users.
+USER_EMAIL = "bench-user-{}@example.com"
+USER_PASSWORD = "bench-password"
+
+
+async def seed_books(books: int, authors: int, genres: int, users: int, favorites: int, seed: int):
+    rng = random.Random(seed)
+    print(f"Seeding {books} books, {authors} authors, {genres} genres, {users} users "
+          f"with {favorites} favorites each (seed={seed})...")
+    all_book_ids = []
+
+    async with session_maker() as session:
+        result = await session.execute(
+            insert(Author).returning(Author.id, sort_by_parameter_order=True),
+            [{"name": f"Name{i}", "surname": f"Surname{i}"} for i in range(authors)]
+        )
+        author_ids = result.scalars().all()
+        result = await session.execute(
+            insert(Genre).returning(Genre.id, sort_by_parameter_order=True),
+            [{"name": f"Genre{i}"} for i in range(genres)]
+        )
+        genre_ids = result.scalars().all()
+
+        for start in range(0, books, BATCH_SIZE):
+            count = min(BATCH_SIZE, books - start)
+            result = await session.execute(
+                insert(Book).returning(Book.id, sort_by_parameter_order=True),
+                [{"title": f"Book {start + i} {rng.getrandbits(32):08x}",
+                  "description": f"Description of book {start + i}"} for i in range(count)]
+            )
+            book_ids = result.scalars().all()
+            all_book_ids.extend(book_ids)
+
+            await session.execute(insert(book_authors), [
+                {"book_id": book_id, "author_id": author_id}
+                for book_id in book_ids
+                for author_id in rng.sample(author_ids, rng.randint(1, min(3, len(author_ids))))
+            ])
+            await session.execute(insert(book_genres), [
+                {"book_id": book_id, "genre_id": genre_id}
+                for book_id in book_ids
+                for genre_id in rng.sample(genre_ids, rng.randint(1, min(3, len(genre_ids))))
+            ])
+            await session.commit()
+            print(f"  {start + count}/{books}")
+
+        if users:
+            # One hash for everyone: argon2 is deliberately slow and the benchmark only needs valid logins.
+            password = await get_password_hash(USER_PASSWORD)
+            result = await session.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [{"email": USER_EMAIL.format(i), "password": password,
+                  "role": UserRole.ADMIN if i == 0 else UserRole.USER} for i in range(users)]
+            )
+            user_ids = result.scalars().all()
+            for start in range(0, users, BATCH_SIZE):
+                await session.execute(insert(user_books), [
+                    {"user_id": user_id, "book_id": book_id}
+                    for user_id in user_ids[start:start + BATCH_SIZE]
+                    for book_id in rng.sample(all_book_ids, min(favorites, len(all_book_ids)))
+                ])
+            await session.commit()
+            await rebuild_popularity(session)
+            print(f"  {users} users, first one is an admin ({USER_EMAIL.format(0)} / {USER_PASSWORD})")
+
+    print("✅ Done")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill the database with generated books.")
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--authors", type=int, default=10_000)
+    parser.add_argument("--genres", type=int, default=50)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--favorites", type=int, default=20, help="Favorite books per user.")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(seed_books(args.books, args.authors, args.genres, args.users, args.favorites, args.seed))
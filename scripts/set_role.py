@@ -5,6 +5,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from sqlalchemy import select
+from src.auth.revocation import revoke_user_tokens, is_shared
 from src.db.database import session_maker
 from src.user.model import User, UserRole
 
@@ -41,8 +42,13 @@ async def change_user_role():
         user.role = new_role
 
         await session.commit()
+        # Access tokens carry the role, so tokens issued before the change must stop working.
+        await revoke_user_tokens(user.id)
 
         print(f"✅ Role for user with {email} changed: {old_role} -> {new_role.value}")
+        if not is_shared():
+            print("⚠️ CACHE_BACKEND is not redis, so the running API cannot see this revocation: "
+                  "it picks up the new role within USER_CACHE_TTL_SECONDS.")
 
 
 if __name__ == "__main__":
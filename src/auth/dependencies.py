@@ -1,49 +1,82 @@
+import logging
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.auth.model import Principal
+from src.auth.revocation import is_revoked, is_shared
+from src.auth.user_cache import get_cached_principal, cache_principal
 from src.config import jwt_settings
 from src.db.database import get_db
 from src.user.model import User, UserRole
-from src.user.service import get_user_by_id
+from src.user.service import get_user_by_id, get_user_principal
+
+logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# The role in a token can only be trusted while a role change (scripts.set_role) revokes the user's tokens in
+# every process, which takes the shared store. Without it the role is read from the database instead.
+STATELESS_AUTH = jwt_settings.STATELESS_AUTH and is_shared()
+if jwt_settings.STATELESS_AUTH and not STATELESS_AUTH:
+    logger.warning("STATELESS_AUTH needs CACHE_BACKEND=redis to see role changes, reading roles from the database")
 
-async def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        db: AsyncSession = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+
+async def decode_access_token(token: str = Depends(oauth2_scheme)) -> dict:
     try:
         payload = jwt.decode(
             token,
             jwt_settings.ACCESS_TOKEN_SECRET,
             algorithms=[jwt_settings.ALGORITHM]
         )
+    except JWTError:
+        raise credentials_exception
+
+    if payload.get("id") is None or await is_revoked(payload):
+        raise credentials_exception
+    return payload
 
-        user_id: int = payload.get("id")
 
-        if user_id is None:
+async def get_current_user(
+        payload: dict = Depends(decode_access_token),
+        db: AsyncSession = Depends(get_db)
+) -> Principal:
+    user_id: int = payload["id"]
+
+    if STATELESS_AUTH:
+        try:
+            return Principal(id=user_id, role=payload.get("role"))
+        except ValueError:
             raise credentials_exception
 
-    except JWTError:
-        raise credentials_exception
+    principal = get_cached_principal(user_id)
+    if principal is None:
+        principal = await get_user_principal(user_id, db)
+        if principal is None:
+            raise credentials_exception
+        cache_principal(principal)
+    return principal
 
-    user = await get_user_by_id(user_id, db)
 
-    if user is None:
+async def get_current_user_from_db(
+        payload: dict = Depends(decode_access_token),
+        db: AsyncSession = Depends(get_db)
+) -> User:
+    try:
+        return await get_user_by_id(payload["id"], db)
+    except HTTPException:
         raise credentials_exception
 
-    return user
-
 
-async def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != UserRole.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -2,6 +2,8 @@ import enum
 
 from pydantic import BaseModel
 
+from src.user.model import UserRole
+
 
 class TokenType(str, enum.Enum):
     ACCESS = "access_token"
@@ -15,3 +17,8 @@ class Token(BaseModel):
 
 class TokenRefresh(BaseModel):
     refresh_token: str
+
+
+class Principal(BaseModel):
+    id: int
+    role: UserRole
@@ -0,0 +1,124 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from fastapi import HTTPException, Request, status
+
+from src.config import rate_limit_settings
+
+RATE_LIMITED = "Too many attempts, try again later."
+
+# KEYS[1] = bucket, ARGV = capacity, refill per second, now. Returns the seconds to wait, "0" when allowed.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def take_token(tokens: float, updated_at: float, now: float, capacity: int,
+               rate: float) -> tuple[float, float]:
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, capacity: int, rate: float) -> float: ...
+
+
+class MemoryRateLimiter:
+    def __init__(self, max_buckets: int):
+        self.max_buckets = max_buckets
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (capacity, now))
+        tokens, wait = take_token(tokens, updated_at, now, capacity, rate)
+        self._buckets[key] = (tokens, now)
+        # The least recently used buckets have had the longest to refill, so evicting them loses the least.
+        while len(self._buckets) > self.max_buckets:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class SharedRateLimiter:
+    def __init__(self, client, prefix: str = "library:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, capacity: int, rate: float) -> float:
+        # Wall-clock time, since every worker updates the same bucket.
+        return float(await self.client.eval(TOKEN_BUCKET_SCRIPT, 1, self.prefix + key, capacity, rate, time.time()))
+
+
+def create_backend() -> RateLimitBackend | None:
+    if rate_limit_settings.RATE_LIMIT_BACKEND == "memory":
+        return MemoryRateLimiter(rate_limit_settings.RATE_LIMIT_MAX_BUCKETS)
+    if rate_limit_settings.RATE_LIMIT_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package to be installed.")
+        return SharedRateLimiter(redis.from_url(rate_limit_settings.RATE_LIMIT_URL))
+    if rate_limit_settings.RATE_LIMIT_BACKEND == "none":
+        return None
+    raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND '{rate_limit_settings.RATE_LIMIT_BACKEND}'.")
+
+
+rate_limit_backend = create_backend()
+
+
+async def _email_from(request: Request) -> str | None:
+    # Starlette caches the parsed body, so reading it here costs the endpoint nothing.
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            body = await request.json()
+            email = body.get("email") if isinstance(body, dict) else None
+        else:
+            email = (await request.form()).get("username")
+    except ValueError:
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+async def _check(key: str, capacity: int, per_minute: float) -> None:
+    wait = await rate_limit_backend.take(key, capacity, per_minute / 60)
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=RATE_LIMITED,
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def rate_limit(scope: str, by_email: bool = False):
+    async def dependency(request: Request) -> None:
+        if rate_limit_backend is None:
+            return
+        client_ip = request.client.host if request.client else "unknown"
+        await _check(f"{scope}:ip:{client_ip}", rate_limit_settings.RATE_LIMIT_IP_CAPACITY,
+                     rate_limit_settings.RATE_LIMIT_IP_PER_MINUTE)
+        email = await _email_from(request) if by_email else None
+        if email is not None:
+            await _check(f"{scope}:email:{email}", rate_limit_settings.RATE_LIMIT_EMAIL_CAPACITY,
+                         rate_limit_settings.RATE_LIMIT_EMAIL_PER_MINUTE)
+
+    return dependency
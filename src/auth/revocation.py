@@ -0,0 +1,74 @@
+import heapq
+import math
+import time
+from typing import Any
+
+from src.auth.user_cache import invalidate_principal
+from src.cache import CacheBackend, SharedCache, response_cache
+from src.config import jwt_settings
+
+
+class MemoryRevocationStore:
+    # Unlike MemoryCache nothing is evicted early, a dropped entry would make a revoked token valid again.
+    def __init__(self):
+        self._entries: dict[str, tuple[Any, float]] = {}
+        # (expires_at, key), so expired entries are swept from the front without scanning every entry.
+        self._expiries: list[tuple[float, str]] = []
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        now = time.time()
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, expired = heapq.heappop(self._expiries)
+            # Skip heap entries of keys that have been set again since.
+            if self._entries.get(expired, (None, None))[1] == expires_at:
+                del self._entries[expired]
+        self._entries[key] = (value, now + ttl)
+        heapq.heappush(self._expiries, (now + ttl, key))
+
+
+def _create_store() -> CacheBackend | MemoryRevocationStore:
+    # With CACHE_BACKEND=redis every worker, and scripts such as set_role, see the same revocations; otherwise
+    # they only affect the process that recorded them.
+    if isinstance(response_cache.backend, SharedCache):
+        return response_cache.backend
+    return MemoryRevocationStore()
+
+
+_store = _create_store()
+
+
+def is_shared() -> bool:
+    return isinstance(_store, SharedCache)
+
+
+async def revoke_token(payload: dict) -> None:
+    jti = payload.get("jti")
+    if jti is None:
+        return
+    ttl = math.ceil(payload.get("exp", 0) - time.time())
+    if ttl > 0:
+        await _store.set(f"revoked:token:{jti}", True, ttl)
+
+
+async def revoke_user_tokens(user_id: int) -> None:
+    # Kept as long as the longest-lived token issued before now can still be presented.
+    ttl = max(jwt_settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60, jwt_settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60)
+    await _store.set(f"revoked:user:{user_id}", int(time.time() * 1000), ttl)
+    invalidate_principal(user_id)
+
+
+async def is_revoked(payload: dict) -> bool:
+    if payload.get("jti") is not None and await _store.get(f"revoked:token:{payload['jti']}") is not None:
+        return True
+    revoked_at = await _store.get(f"revoked:user:{payload.get('id')}")
+    if revoked_at is None:
+        return False
+    # Tokens issued before iat_ms existed fall back to iat, which is rounded down to the second.
+    issued_at = payload.get("iat_ms", payload.get("iat", 0) * 1000)
+    return issued_at < revoked_at
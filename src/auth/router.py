@@ -1,28 +1,32 @@
 from fastapi import APIRouter, HTTPException, status, Response
 from fastapi.params import Depends, Cookie
 from fastapi.security import OAuth2PasswordRequestForm
-from jose import jwt
+from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.auth.dependencies import get_current_user
+from src.auth.dependencies import get_current_user_from_db
 from src.auth.model import Token
+from src.auth.rate_limit import rate_limit
+from src.auth.revocation import revoke_token, is_revoked
 from src.auth.security import create_access_token, create_refresh_token
 from src.config import jwt_settings
 from src.db.database import get_db
 from src.user.model import User
 from src.user.schema import UserCreateSchema, UserResponseSchema
-from src.user.service import create_user, authenticate_user, get_user_by_id
+from src.user.service import create_user, authenticate_user, get_user_principal
 
 router = APIRouter(prefix="/api/auth", tags=["Authorization"])
 
 
-@router.post("/register", status_code=201, response_model=UserResponseSchema)
+@router.post("/register", status_code=201, response_model=UserResponseSchema,
+             dependencies=[Depends(rate_limit("register", by_email=True))])
 async def register_user(user_dto: UserCreateSchema, db: AsyncSession = Depends(get_db)) -> UserResponseSchema:
     user = await create_user(user_dto, db)
     return UserResponseSchema.model_validate(user, from_attributes=True)
 
 
-@router.post("/login", status_code=200, response_model=Token)
+@router.post("/login", status_code=200, response_model=Token,
+             dependencies=[Depends(rate_limit("login", by_email=True))])
 async def login_user(response: Response,
                      form_data: OAuth2PasswordRequestForm = Depends(),
                      db: AsyncSession = Depends(get_db)) -> Token:
@@ -49,19 +53,26 @@ async def login_user(response: Response,
     return Token(access_token=access_token)
 
 
-@router.post("/refresh", status_code=200, response_model=Token)
+@router.post("/refresh", status_code=200, response_model=Token, dependencies=[Depends(rate_limit("refresh"))])
 async def refresh_user(response: Response,
                        refresh_token: str | None = Cookie(default=None),
                        db: AsyncSession = Depends(get_db)) -> Token:
     if not refresh_token:
         raise HTTPException(status_code=401, detail="Refresh token missing")
 
-    payload = jwt.decode(refresh_token, jwt_settings.REFRESH_TOKEN_SECRET, algorithms=jwt_settings.ALGORITHM)
-    user = await get_user_by_id(payload.get("id"), db)
+    try:
+        payload = jwt.decode(refresh_token, jwt_settings.REFRESH_TOKEN_SECRET, algorithms=jwt_settings.ALGORITHM)
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if await is_revoked(payload):
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    user = await get_user_principal(payload.get("id"), db)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    await revoke_token(payload)
     new_payload = {"id": user.id, "role": user.role.value}
     new_access_token = create_access_token(new_payload)
     new_refresh_token = create_refresh_token(new_payload)
@@ -79,11 +90,18 @@ async def refresh_user(response: Response,
 
 
 @router.post("/logout", status_code=200, response_model=dict[str, str])
-async def logout(response: Response) -> dict[str, str]:
+async def logout(response: Response, refresh_token: str | None = Cookie(default=None)) -> dict[str, str]:
+    if refresh_token:
+        try:
+            payload = jwt.decode(refresh_token, jwt_settings.REFRESH_TOKEN_SECRET, algorithms=jwt_settings.ALGORITHM)
+        except JWTError:
+            payload = None
+        if payload is not None:
+            await revoke_token(payload)
     response.delete_cookie(key="refresh_token")
     return {"message": "Logged out successfully"}
 
 
 @router.get("/me", response_model=UserResponseSchema)
-async def get_current_user(user: User = Depends(get_current_user)) -> UserResponseSchema:
+async def get_current_user(user: User = Depends(get_current_user_from_db)) -> UserResponseSchema:
     return UserResponseSchema.model_validate(user)
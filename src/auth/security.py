@@ -1,3 +1,6 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from fastapi import HTTPException, status
@@ -5,22 +8,47 @@ from jose import jwt
 from passlib.context import CryptContext
 
 from src.auth.model import TokenType
-from src.config import jwt_settings
+from src.config import jwt_settings, hash_settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=hash_settings.ARGON2_TIME_COST,
+    argon2__memory_cost=hash_settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=hash_settings.ARGON2_PARALLELISM,
+)
 
+# argon2-cffi releases the GIL while hashing, so a thread pool keeps the event loop free.
+hash_executor = ThreadPoolExecutor(max_workers=hash_settings.HASH_WORKERS, thread_name_prefix="argon2")
+_hash_jobs = 0
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
 
+async def _run_in_hash_pool(func, *args):
+    global _hash_jobs
+    if _hash_jobs >= hash_settings.HASH_WORKERS + hash_settings.HASH_MAX_PENDING:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Server is busy, try again later.",
+                            headers={"Retry-After": "1"})
+    _hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(hash_executor, func, *args)
+    finally:
+        _hash_jobs -= 1
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await _run_in_hash_pool(pwd_context.verify, plain_password, hashed_password)
 
 
 def create_jwt_token(data: dict, token_type: TokenType) -> str:
     to_encode = data.copy()
     now = datetime.now(timezone.utc)
+    # iat only has second precision, iat_ms lets revocations reject tokens issued earlier in the same second.
+    to_encode.update({"iat": now, "iat_ms": int(now.timestamp() * 1000), "jti": uuid.uuid4().hex})
 
     if token_type == TokenType.ACCESS:
         expires = now + timedelta(minutes=jwt_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,35 @@
+import time
+
+from src.auth.model import Principal
+from src.config import jwt_settings
+
+MAX_CACHED_PRINCIPALS = 10_000
+
+_principals: dict[int, tuple[Principal, float]] = {}
+
+
+def get_cached_principal(user_id: int) -> Principal | None:
+    entry = _principals.get(user_id)
+    if entry is None:
+        return None
+    principal, expires_at = entry
+    if expires_at <= time.monotonic():
+        del _principals[user_id]
+        return None
+    return principal
+
+
+def cache_principal(principal: Principal) -> None:
+    if jwt_settings.USER_CACHE_TTL_SECONDS <= 0:
+        return
+    now = time.monotonic()
+    if len(_principals) >= MAX_CACHED_PRINCIPALS:
+        for user_id in [user_id for user_id, (_, expires_at) in _principals.items() if expires_at <= now]:
+            del _principals[user_id]
+        if len(_principals) >= MAX_CACHED_PRINCIPALS:
+            _principals.clear()
+    _principals[principal.id] = (principal, now + jwt_settings.USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(user_id: int) -> None:
+    _principals.pop(user_id, None)
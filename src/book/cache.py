@@ -0,0 +1,73 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.cache import response_cache
+from src.config import db_settings
+from src.db.database import PINNED_TO_PRIMARY, FROM_REPLICA
+
+NAMESPACE = "books"
+RECENT_WRITE_KEY = f"{NAMESPACE}:recent_write"
+
+
+def _key(generation: int, kind: str, parts: tuple) -> str:
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f"{NAMESPACE}:{generation}:{kind}:{digest}"
+
+
+async def cache_key(kind: str, *parts) -> str:
+    # Every key embeds the catalog generation, so bumping it drops all cached book responses at once. With the
+    # memory backend the generation is per process, so that only holds for the worker that handled the write.
+    return _key(await response_cache.generation(NAMESPACE), kind, parts)
+
+
+async def cache_keys(kind: str, parts: Iterable[tuple]) -> list[str]:
+    # Same keys as cache_key, for many entries at the cost of one generation read.
+    generation = await response_cache.generation(NAMESPACE)
+    return [_key(generation, kind, item) for item in parts]
+
+
+async def get_cached(key: str, db: AsyncSession) -> Any | None:
+    # A client pinned to the primary has just written and must see its own write, not a cached body.
+    if db.info.get(PINNED_TO_PRIMARY):
+        return None
+    return await response_cache.get(key)
+
+
+async def get_cached_many(keys: list[str], db: AsyncSession) -> list[Any | None]:
+    if db.info.get(PINNED_TO_PRIMARY):
+        return [None] * len(keys)
+    return await response_cache.get_many(keys)
+
+
+async def _may_cache(db: AsyncSession) -> bool:
+    if db.info.get(PINNED_TO_PRIMARY):
+        return False
+    # A replica read shortly after a write may predate it; caching it would serve the old body under the new
+    # generation to everyone for a full TTL.
+    return not (db.info.get(FROM_REPLICA) and await response_cache.is_marked(RECENT_WRITE_KEY))
+
+
+async def set_cached(key: str, value: Any, db: AsyncSession) -> None:
+    if await _may_cache(db):
+        await response_cache.set(key, value)
+
+
+async def set_cached_many(values: dict[str, Any], db: AsyncSession) -> None:
+    if values and await _may_cache(db):
+        await response_cache.set_many(values)
+
+
+async def get_or_load(key: str, loader: Callable[[], Awaitable[Any]], db: AsyncSession) -> Any:
+    value = await get_cached(key, db)
+    if value is None:
+        value = await loader()
+        await set_cached(key, value, db)
+    return value
+
+
+async def invalidate_books() -> None:
+    await response_cache.bump_generation(NAMESPACE)
+    if db_settings.replica_urls:
+        await response_cache.mark(RECENT_WRITE_KEY, db_settings.DB_READ_YOUR_WRITES_SECONDS)
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Callable, Literal, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.book.service import begin_snapshot, get_catalog_fingerprint, iter_book_row_batches, csv_header, rows_to_csv, rows_to_ndjson
+from src.config import export_settings
+from src.db.database import replicas, session_maker
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["csv", "ndjson"]
+EXPORT_NOT_FOUND = "Export not found."
+EXPORT_INTERRUPTED = "Export was interrupted, start it again."
+# format: (media type, header, batch formatter)
+FORMATS: dict[str, tuple[str, Callable[[], str], Callable[[Sequence], str]]] = {
+    "csv": ("text/csv", csv_header, rows_to_csv),
+    "ndjson": ("application/x-ndjson", lambda: "", rows_to_ndjson),
+}
+
+
+@dataclass
+class ExportJob:
+    id: str
+    format: str
+    total_rows: int | None
+    status: Literal["running", "done", "failed"] = "running"
+    rows_written: int = 0
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: datetime | None = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(export_settings.EXPORT_DIR, f"{self.id}.{self.format}")
+
+    @property
+    def state_path(self) -> str:
+        return f"{self.path}.json"
+
+    @property
+    def lock_path(self) -> str:
+        return f"{self.path}.lock"
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][0]
+
+
+# Job state lives in EXPORT_DIR next to the files, so every worker sees the same jobs: {id}.{format}.json holds
+# the state, {id}.{format}.lock is held by the worker writing the export.
+_tasks: set[asyncio.Task] = set()
+
+
+def _job_id(export_format: str, fingerprint: str) -> str:
+    # Derived from the catalog fingerprint, so identical requests map to the same job and file.
+    return hashlib.sha1(f"{export_format}:{fingerprint}".encode()).hexdigest()[:20]
+
+
+def _save(job: ExportJob) -> None:
+    state = asdict(job) | {"created_at": job.created_at.isoformat(),
+                           "finished_at": job.finished_at.isoformat() if job.finished_at else None}
+    temporary = f"{job.state_path}.{uuid.uuid4().hex}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(state, file)
+    os.replace(temporary, job.state_path)
+
+
+def _load(job_id: str, export_format: str) -> ExportJob | None:
+    try:
+        with open(ExportJob(job_id, export_format, None).state_path) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return None
+    state["created_at"] = datetime.fromisoformat(state["created_at"])
+    state["finished_at"] = datetime.fromisoformat(state["finished_at"]) if state["finished_at"] else None
+    return ExportJob(**state)
+
+
+def _lock_is_stale(job: ExportJob) -> bool:
+    # The writer touches its lock after every batch; one that stopped doing so has most likely died.
+    try:
+        return time.time() - os.path.getmtime(job.lock_path) > export_settings.EXPORT_STALE_SECONDS
+    except FileNotFoundError:
+        return True
+
+
+def _claim(job: ExportJob) -> bool:
+    for _ in range(2):
+        try:
+            os.close(os.open(job.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            if not _lock_is_stale(job):
+                return False
+        try:
+            os.remove(job.lock_path)
+        except FileNotFoundError:
+            pass
+    return False
+
+
+def _finished_job(job_id: str, export_format: str, total_rows: int | None) -> ExportJob | None:
+    job = ExportJob(job_id, export_format, total_rows, status="done")
+    try:
+        finished_at = os.path.getmtime(job.path)
+    except OSError:
+        return None
+    job.finished_at = datetime.fromtimestamp(finished_at, timezone.utc)
+    job.created_at = job.finished_at
+    job.rows_written = total_rows or 0
+    return job
+
+
+async def start_export(export_format: ExportFormat, db: AsyncSession) -> ExportJob:
+    fingerprint, total_rows = await get_catalog_fingerprint(db)
+    job_id = _job_id(export_format, fingerprint)
+    os.makedirs(export_settings.EXPORT_DIR, exist_ok=True)
+    job = _load(job_id, export_format) or _finished_job(job_id, export_format, total_rows)
+    if job is not None and job.status == "done" and os.path.exists(job.path):
+        return job
+
+    job = ExportJob(job_id, export_format, total_rows)
+    if not _claim(job):
+        # Another worker is already writing this export.
+        return _load(job_id, export_format) or job
+    _save(job)
+    task = asyncio.create_task(_run(job, fingerprint))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def _write_batch(file, text: str, job: ExportJob) -> None:
+    file.write(text)
+    _save(job)
+    os.utime(job.lock_path)
+
+
+async def _snapshot(session: AsyncSession) -> tuple[str, int]:
+    try:
+        await begin_snapshot(session)
+        return await get_catalog_fingerprint(session)
+    except Exception:
+        await session.close()
+        raise
+
+
+async def _open_snapshot(fingerprint: str) -> tuple[AsyncSession, int]:
+    # The fingerprint is checked in the snapshot the rows are read from, so a replica that has not caught up
+    # with the request's read cannot write an older catalog under the job id. If the primary has moved on
+    # since, the export is newer than its id, which a later request for the old fingerprint can live with.
+    session = await replicas.open_session()
+    if session is not None:
+        current, total_rows = await _snapshot(session)
+        if current == fingerprint:
+            return session, total_rows
+        await session.close()
+    session = session_maker()
+    return session, (await _snapshot(session))[1]
+
+
+async def _run(job: ExportJob, fingerprint: str) -> None:
+    _, header, formatter = FORMATS[job.format]
+    partial = f"{job.path}.{uuid.uuid4().hex}.part"
+    try:
+        session, job.total_rows = await _open_snapshot(fingerprint)
+        async with session:
+            with open(partial, "w", encoding="utf-8", newline="") as file:
+                await asyncio.to_thread(file.write, header())
+                async for rows in iter_book_row_batches(session, export_settings.EXPORT_BATCH_SIZE):
+                    job.rows_written += len(rows)
+                    await asyncio.to_thread(_write_batch, file, formatter(rows), job)
+        # Readers only ever see complete files.
+        os.replace(partial, job.path)
+        job.status = "done"
+    except Exception as exc:
+        logger.exception("Export %s failed", job.id)
+        job.status, job.error = "failed", str(exc)
+        if os.path.exists(partial):
+            os.remove(partial)
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        # The state is final before the lock is released, so no worker sees a released lock on a running job.
+        _save(job)
+        try:
+            os.remove(job.lock_path)
+        except FileNotFoundError:
+            pass
+    if job.status == "done":
+        _remove_stale(job)
+
+
+def _remove_stale(current: ExportJob) -> None:
+    for name in os.listdir(export_settings.EXPORT_DIR):
+        job_id, _, suffix = name.partition(".")
+        if job_id == current.id or not suffix.startswith(current.format):
+            continue
+        # Leave exports another worker is still writing alone.
+        if not _lock_is_stale(ExportJob(job_id, current.format, None)):
+            continue
+        try:
+            os.remove(os.path.join(export_settings.EXPORT_DIR, name))
+        except OSError:
+            pass
+
+
+def get_export(job_id: str) -> ExportJob:
+    if not job_id.isalnum():
+        raise HTTPException(status_code=404, detail=EXPORT_NOT_FOUND)
+    for export_format in FORMATS:
+        job = _load(job_id, export_format)
+        if job is None:
+            job = _finished_job(job_id, export_format, None)
+        elif job.status == "running" and _lock_is_stale(job):
+            job.status, job.error = "failed", EXPORT_INTERRUPTED
+        elif job.status == "done" and not os.path.exists(job.path):
+            # Superseded and removed by an export of a newer catalog.
+            job = None
+        if job is not None:
+            return job
+    raise HTTPException(status_code=404, detail=EXPORT_NOT_FOUND)
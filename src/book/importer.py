@@ -0,0 +1,308 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from python_multipart.multipart import MultipartParser, MultipartParseError, parse_options_header
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.book.cache import invalidate_books
+from src.book.model import Book, Author, Genre, book_authors, book_genres
+from src.book.schema import CreateBookSchema, BulkImportResponse, BulkImportError
+from src.book.service import CSV_HEADER, resolve_keys, split_author_name
+
+BULK_IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Longest JSON item or CSV record accepted; anything longer is treated as malformed so a broken upload cannot
+# make the parser buffer the rest of it.
+MAX_ITEM_SIZE = 1024 * 1024
+INVALID_JSON = "Request body must be a JSON array of books."
+INVALID_MULTIPART = "Malformed multipart body."
+MISSING_FILE = "Form field 'file' is required."
+
+
+class MultipartUpload:
+    # Streams one file field out of a multipart body as it arrives, unlike Request.form() which spools the
+    # whole upload before returning.
+    def __init__(self, body: AsyncIterator[bytes], content_type: str, field: str = "file"):
+        _, params = parse_options_header(content_type)
+        if not params.get(b"boundary"):
+            raise HTTPException(status_code=400, detail=INVALID_MULTIPART)
+        self.field = field.encode()
+        self.filename: str | None = None
+        self.content_type: str | None = None
+        self._body = aiter(body)
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._in_file = False
+        self._file_ended = False
+        self._data: list[bytes] = []
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.filename is None and options.get(b"name") == self.field and b"filename" in options:
+            self._in_file = True
+            self.filename = options[b"filename"].decode("latin-1")
+            self.content_type = parse_options_header(self._headers.get(b"content-type", b""))[0].decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file:
+            self._in_file = False
+            self._file_ended = True
+
+    async def _feed(self) -> bool:
+        try:
+            chunk = await anext(self._body)
+        except StopAsyncIteration:
+            return False
+        try:
+            self._parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(status_code=400, detail=INVALID_MULTIPART)
+        return True
+
+    async def open(self) -> None:
+        # Reads up to the headers of the file part, so the caller can pick a parser from its name and type.
+        while self.filename is None:
+            if not await self._feed():
+                raise HTTPException(status_code=400, detail=MISSING_FILE)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            if self._data:
+                data, self._data = b"".join(self._data), []
+                yield data
+            if self._file_ended or not await self._feed():
+                return
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+async def iter_json_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict | ValueError]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    async for text in _iter_text(chunks):
+        buffer += text
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise HTTPException(status_code=400, detail=INVALID_JSON)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if len(buffer) - pos > MAX_ITEM_SIZE:
+                    yield ValueError(f"Malformed JSON or an item longer than {MAX_ITEM_SIZE} characters, "
+                                     f"the rest of the input was skipped.")
+                    return
+                # Most likely the item is split across chunks; wait for more data.
+                break
+            yield item
+        buffer = buffer[pos:]
+    if not started:
+        raise HTTPException(status_code=400, detail=INVALID_JSON)
+    yield ValueError("Malformed or truncated JSON, the rest of the input was skipped.")
+
+
+def _parse_csv_record(record: str) -> dict:
+    row = next(csv.reader([record], delimiter=";", quotechar='"'))
+    if len(row) != len(CSV_HEADER):
+        raise ValueError(f"Expected {len(CSV_HEADER)} columns, got {len(row)}.")
+    _, title, description, authors, genres = row
+    return {
+        "title": title,
+        "description": description or None,
+        "authors": [author.strip() for author in authors.split(",") if author.strip()],
+        "genres": [genre.strip() for genre in genres.split(",") if genre.strip()],
+    }
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[dict | ValueError]:
+    buffer = ""
+    record = ""
+    header_seen = False
+    async for text in _iter_text(chunks):
+        buffer += text
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            record += line + "\n"
+            # An odd number of quotes means a quoted field continues on the next line.
+            if record.count('"') % 2:
+                continue
+            if not header_seen:
+                header_seen = True
+            elif record.strip():
+                try:
+                    yield _parse_csv_record(record)
+                except (ValueError, csv.Error) as e:
+                    yield ValueError(str(e))
+            record = ""
+        if len(record) + len(buffer) > MAX_ITEM_SIZE:
+            yield ValueError(f"Unbalanced quotes or a record longer than {MAX_ITEM_SIZE} characters, "
+                             f"the rest of the input was skipped.")
+            return
+
+    record += buffer
+    if record.strip() and header_seen:
+        try:
+            yield _parse_csv_record(record)
+        except (ValueError, csv.Error) as e:
+            yield ValueError(str(e))
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in error.errors())
+
+
+class BookImporter:
+    def __init__(self, db: AsyncSession, batch_size: int = BULK_IMPORT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.author_ids: dict[tuple[str, str], int] = {}
+        self.genre_ids: dict[str, int] = {}
+        self.batch: list[tuple[int, CreateBookSchema, list[tuple[str, str]]]] = []
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[BulkImportError] = []
+
+    def _fail(self, row: int, detail: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(BulkImportError(row=row, detail=detail))
+
+    async def add(self, row: int, data) -> None:
+        if isinstance(data, Exception):
+            self._fail(row, str(data))
+            return
+        try:
+            dto = CreateBookSchema.model_validate(data)
+            authors = list(dict.fromkeys(split_author_name(author) for author in dto.authors))
+        except ValidationError as e:
+            self._fail(row, _format_validation_error(e))
+            return
+        except HTTPException as e:
+            self._fail(row, e.detail)
+            return
+
+        self.batch.append((row, dto, authors))
+        if len(self.batch) >= self.batch_size:
+            await self.flush()
+
+    async def _load_authors(self, keys: list[tuple[str, str]]) -> None:
+        missing = [key for key in dict.fromkeys(keys) if key not in self.author_ids]
+        self.author_ids.update(await resolve_keys(Author.id, [Author.name, Author.surname], missing, self.db))
+
+    async def _load_genres(self, names: list[str]) -> None:
+        missing = [(name,) for name in dict.fromkeys(names) if name not in self.genre_ids]
+        genre_ids = await resolve_keys(Genre.id, [Genre.name], missing, self.db)
+        self.genre_ids.update({name: id_ for (name,), id_ in genre_ids.items()})
+
+    async def flush(self) -> None:
+        batch, self.batch = self.batch, []
+        if batch:
+            await self._import(batch)
+
+    async def _import(self, batch: list[tuple[int, CreateBookSchema, list[tuple[str, str]]]]) -> None:
+        try:
+            await self._load_authors([key for _, _, authors in batch for key in authors])
+            await self._load_genres([name for _, dto, _ in batch for name in dto.genres])
+
+            result = await self.db.execute(
+                insert(Book).returning(Book.id, sort_by_parameter_order=True),
+                [{"title": dto.title, "description": dto.description} for _, dto, _ in batch]
+            )
+            book_ids = result.scalars().all()
+
+            author_rows = [{"book_id": book_id, "author_id": self.author_ids[key]}
+                           for book_id, (_, _, authors) in zip(book_ids, batch) for key in authors]
+            genre_rows = [{"book_id": book_id, "genre_id": self.genre_ids[name]}
+                          for book_id, (_, dto, _) in zip(book_ids, batch) for name in dict.fromkeys(dto.genres)]
+            if author_rows:
+                await self.db.execute(insert(book_authors), author_rows)
+            if genre_rows:
+                await self.db.execute(insert(book_genres), genre_rows)
+
+            await self.db.commit()
+        except (DBAPIError, KeyError) as e:
+            await self.db.rollback()
+            # Ids cached from the rolled back transaction may no longer exist.
+            self.author_ids.clear()
+            self.genre_ids.clear()
+            if len(batch) > 1:
+                # Retry row by row, so only the rows that actually fail are reported and the rest still land.
+                for item in batch:
+                    await self._import([item])
+                return
+            reason = e.__class__.__name__
+            if isinstance(e, DBAPIError):
+                # The driver's message (e.g. the violated constraint) without the SQL statement.
+                reason = str(e.orig).strip().splitlines()[0]
+            self._fail(batch[0][0], f"Row was not imported: {reason}")
+            return
+
+        self.imported += len(batch)
+
+    def result(self) -> BulkImportResponse:
+        return BulkImportResponse(imported=self.imported, failed=self.failed, errors=self.errors)
+
+
+async def import_books(rows: AsyncIterator[dict | ValueError], db: AsyncSession) -> BulkImportResponse:
+    importer = BookImporter(db)
+    row = 0
+    async for data in rows:
+        row += 1
+        await importer.add(row, data)
+    await importer.flush()
+    if importer.imported:
+        await invalidate_books()
+    return importer.result()
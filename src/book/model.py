@@ -1,4 +1,8 @@
-from sqlalchemy import Column, Integer, String, Table, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Table, ForeignKey, Index, UniqueConstraint, DateTime, func, BigInteger, \
+    text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, relationship, mapped_column
 
 from src.db.database import Base
@@ -12,7 +16,8 @@ book_authors = Table('book_authors',
                      Column('book_id',
                             Integer,
                             ForeignKey('books.id', ondelete="CASCADE"),
-                            primary_key=True))
+                            primary_key=True),
+                     Index('ix_book_authors_book_id', 'book_id'))
 
 book_genres = Table('book_genres',
                     Base.metadata,
@@ -23,23 +28,36 @@ book_genres = Table('book_genres',
                     Column('book_id',
                            Integer,
                            ForeignKey('books.id', ondelete="CASCADE"),
-                           primary_key=True))
+                           primary_key=True),
+                    Index('ix_book_genres_book_id', 'book_id'))
 
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        Index("ix_books_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String, nullable=False, unique=False)
     description: Mapped[str] = mapped_column(String, nullable=True)
+    # Maintained by the books_search_vector triggers, whoever writes the book or its links.
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=True, deferred=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False,
+                                                 server_default=func.now())
     authors: Mapped[list["Author"]] = relationship(secondary=book_authors, back_populates="books",
                                                    passive_deletes=True)
     genres: Mapped[list["Genre"]] = relationship(secondary=book_genres, back_populates="books",
                                                  passive_deletes=True)
 
+    __mapper_args__ = {"eager_defaults": True}
+
 
 class Author(Base):
     __tablename__ = "authors"
+    __table_args__ = (UniqueConstraint("name", "surname", name="uq_authors_name_surname"),)
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False, unique=False)
     surname: Mapped[str] = mapped_column(String, nullable=False, unique=False)
@@ -55,3 +73,24 @@ class Genre(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
     books: Mapped[list["Book"]] = relationship(secondary=book_genres, back_populates="genres", passive_deletes=True)
+
+
+class BookPopularity(Base):
+    __tablename__ = "book_popularity"
+    __table_args__ = (Index("ix_book_popularity_rank", "favorites", "book_id"),)
+    book_id: Mapped[int] = mapped_column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    favorites: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+
+class BookChange(Base):
+    # Written by the books_changes triggers.
+    __tablename__ = "book_changes"
+    __table_args__ = (Index("ix_book_changes_feed", "transaction_id", "id"),)
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # No foreign key: a tombstone outlives the book it describes.
+    book_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    operation: Mapped[str] = mapped_column(String, nullable=False)
+    # The writing transaction, which orders the feed (see stream_book_changes).
+    transaction_id: Mapped[int] = mapped_column(BigInteger, nullable=False,
+                                                server_default=text("pg_current_xact_id()::text::bigint"))
+    changed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -1,16 +1,42 @@
-from fastapi import APIRouter, Response
+from typing import Literal
+
+from fastapi import APIRouter, Response, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, FileResponse
 from fastapi.params import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.auth.dependencies import get_current_admin, get_current_user
-from src.book.schema import BookResponse, FavoriteBooksSchema, CreateBookSchema, UpdateBookSchema
-from src.book.service import get_favorite_books_by_user_id, add_book_to_favorite, create_book, update_book, delete_book, \
-    get_book_by_id, get_all_books, get_books_by_title, remove_book_from_favorite, load_books_to_csv
-from src.db.database import get_db
-from src.user.model import User
+from src.auth.model import Principal
+from src.book.cache import cache_key, cache_keys, get_or_load, get_cached, get_cached_many, set_cached, \
+    set_cached_many
+from src.book.exports import ExportFormat, ExportJob, start_export, get_export
+from src.book.etag import book_etag, page_etag, http_date, is_conditional, is_not_modified
+from src.book.importer import iter_csv_rows, iter_json_rows, import_books, MultipartUpload
+from src.book.schema import BookResponse, FavoriteBooksSchema, CreateBookSchema, UpdateBookSchema, BookPageResponse, \
+    BulkImportResponse, BookFilter, BookFacetsResponse, PopularBooksPageResponse, ExportJobResponse
+from src.book.service import BookLoading, get_favorite_book_ids, add_book_to_favorite, create_book, update_book, delete_book, \
+    get_book_by_id, find_books, remove_book_from_favorite, stream_books_csv, \
+    get_book_version, get_page_versions, get_favorite_books_page, get_books_by_ids, get_all_books, \
+    get_books_page, book_row_to_dict, get_book_facets, get_popular_books_page, stream_book_changes, \
+    decode_cursor
+from src.cache import response_cache
+from src.db.database import get_db, get_read_db
+from src.responses import FastJSONResponse
 
 router = APIRouter(prefix="/api/books", tags=["Books"])
 
+MAX_BATCH_IDS = 100
+
+
+def _get_book_filter(genre: list[str] | None = Query(None, description="Genre name, repeat for several."),
+                    author: list[str] | None = Query(None, description="Author full name, repeat for several."),
+                    match: Literal["all", "any"] = Query(
+                        "all", description="Whether books must have all or any of the requested genres/authors."
+                    )) -> BookFilter | None:
+    if not genre and not author:
+        return None
+    return BookFilter(genres=genre or [], authors=author or [], match=match)
+
 
 @router.post("", response_model=BookResponse, dependencies=[Depends(get_current_admin)])
 async def post_books(dto: CreateBookSchema,
@@ -18,17 +44,43 @@ async def post_books(dto: CreateBookSchema,
     return BookResponse.model_validate(await create_book(dto, db))
 
 
+@router.post("/bulk", response_model=BulkImportResponse, dependencies=[Depends(get_current_admin)])
+async def post_books_bulk(request: Request, db: AsyncSession = Depends(get_db)) -> BulkImportResponse:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "multipart/form-data":
+        upload = MultipartUpload(request.stream(), request.headers["content-type"])
+        await upload.open()
+        chunks = upload.chunks()
+        is_csv = upload.content_type == "text/csv" or upload.filename.lower().endswith(".csv")
+    elif content_type in ("application/json", "text/csv"):
+        chunks = request.stream()
+        is_csv = content_type == "text/csv"
+    else:
+        raise HTTPException(status_code=415, detail="Send application/json, text/csv or a multipart file upload.")
+
+    rows = iter_csv_rows(chunks) if is_csv else iter_json_rows(chunks)
+    return await import_books(rows, db)
+
+
 @router.get("/search", response_model=list[BookResponse])
-async def search_books(title: str, db: AsyncSession = Depends(get_db)) -> list[BookResponse]:
-    return [BookResponse.model_validate(book) for book in await get_books_by_title(title, db)]
+async def search_books(q: str | None = Query(None, min_length=1),
+                       title: str | None = Query(None, min_length=1, deprecated=True),
+                       limit: int = Query(20, ge=1, le=100),
+                       db: AsyncSession = Depends(get_read_db)) -> list[dict]:
+    text = q or title
+    if text is None:
+        raise HTTPException(status_code=400, detail="Query parameter 'q' is required.")
 
+    async def load() -> list[dict]:
+        return [book_row_to_dict(row) for row in await find_books(text, limit, db)]
+
+    return await get_or_load(await cache_key("search", text, limit), load, db)
 
-@router.get("/csv", dependencies=[Depends(get_current_admin)])
-async def download_books_csv(db: AsyncSession = Depends(get_db)) -> Response:
-    csv_content = await load_books_to_csv(db)
 
-    return Response(
-        content=csv_content,
+@router.get("/csv", dependencies=[Depends(get_current_admin)])
+async def download_books_csv(db: AsyncSession = Depends(get_read_db)) -> StreamingResponse:
+    return StreamingResponse(
+        content=stream_books_csv(db),
         media_type="text/csv",
         headers={
             "Content-Disposition": "attachment; filename=books_export.csv"
@@ -36,36 +88,196 @@ async def download_books_csv(db: AsyncSession = Depends(get_db)) -> Response:
     )
 
 
+def _export_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        id=job.id, format=job.format, status=job.status, rows_written=job.rows_written, total_rows=job.total_rows,
+        created_at=job.created_at, finished_at=job.finished_at, error=job.error,
+        download_url=router.url_path_for("download_export", export_id=job.id) if job.status == "done" else None,
+    )
+
+
+@router.post("/exports", status_code=202, response_model=ExportJobResponse, dependencies=[Depends(get_current_admin)])
+async def post_export(response: Response,
+                      export_format: ExportFormat = Query("csv", alias="format"),
+                      db: AsyncSession = Depends(get_read_db)) -> ExportJobResponse:
+    job = await start_export(export_format, db)
+    if job.status == "done":
+        response.status_code = 200
+    response.headers["Location"] = router.url_path_for("get_export_status", export_id=job.id)
+    return _export_response(job)
+
+
+@router.get("/exports/{export_id}", response_model=ExportJobResponse, dependencies=[Depends(get_current_admin)])
+async def get_export_status(export_id: str) -> ExportJobResponse:
+    return _export_response(get_export(export_id))
+
+
+@router.get("/exports/{export_id}/file", dependencies=[Depends(get_current_admin)])
+async def download_export(export_id: str) -> FileResponse:
+    job = get_export(export_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export is {job.status}.")
+    # FileResponse answers Range requests, so interrupted downloads can resume.
+    return FileResponse(job.path, media_type=job.media_type, filename=f"books_export.{job.format}")
+
+
+@router.get("/changes", dependencies=[Depends(get_current_admin)])
+async def get_book_changes(since: str | None = Query(None, description="Cursor of the last change already applied."),
+                           limit: int = Query(1000, ge=1, le=10000),
+                           db: AsyncSession = Depends(get_read_db)) -> StreamingResponse:
+    # One JSON object per line; resume from the cursor of the last line, fewer than `limit` lines means caught up.
+    # The cursor is decoded up front so a bad one is a 400 rather than a broken stream.
+    cursor = decode_cursor(since, 2) if since else None
+    return StreamingResponse(content=stream_book_changes(cursor, limit, db), media_type="application/x-ndjson")
+
+
 @router.post("/favorite", response_model=BookResponse)
 async def post_favorite_book(book_id: int,
-                             user: User = Depends(get_current_user),
-                             db: AsyncSession = Depends(get_db)) -> BookResponse:
-    book = await add_book_to_favorite(user.id, book_id, db)
-    return BookResponse.model_validate(book)
+                             user: Principal = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_db)) -> dict:
+    await add_book_to_favorite(user.id, book_id, db)
+    return (await _get_book_entry(book_id, db))["body"]
 
 
 @router.get("/favorites", response_model=FavoriteBooksSchema)
-async def get_favorite_books(user: User = Depends(get_current_user),
+async def get_favorite_books(user: Principal = Depends(get_current_user),
                              db: AsyncSession = Depends(get_db)) -> FavoriteBooksSchema:
-    books = await get_favorite_books_by_user_id(user.id, db)
-    return FavoriteBooksSchema(user_id=user.id, book_ids=[book.id for book in books])
+    return FavoriteBooksSchema(user_id=user.id, book_ids=await get_favorite_book_ids(user.id, db))
+
+
+@router.get("/favorites/expanded", response_model=BookPageResponse)
+async def get_favorite_books_expanded(limit: int = Query(20, ge=1, le=100),
+                                      cursor: str | None = None,
+                                      user: Principal = Depends(get_current_user),
+                                      db: AsyncSession = Depends(get_db)) -> Response:
+    rows, next_cursor = await get_favorite_books_page(user.id, limit, cursor, db)
+    return FastJSONResponse({"items": [book_row_to_dict(row) for row in rows], "next_cursor": next_cursor})
 
 
 @router.delete("/favorite/{book_id}", response_model=BookResponse)
-async def delete_favorite_book(book_id: int, user: User = Depends(get_current_user),
-                               db: AsyncSession = Depends(get_db)) -> BookResponse:
-    book = await remove_book_from_favorite(user.id, book_id, db)
-    return BookResponse.model_validate(book)
+async def delete_favorite_book(book_id: int, user: Principal = Depends(get_current_user),
+                               db: AsyncSession = Depends(get_db)) -> dict:
+    await remove_book_from_favorite(user.id, book_id, db)
+    return (await _get_book_entry(book_id, db))["body"]
+
+
+@router.get("", response_model=list[BookResponse] | BookPageResponse)
+async def get_books(request: Request,
+                    limit: int = Query(20, ge=1, le=1000),
+                    offset: int | None = Query(None, ge=0),
+                    cursor: str | None = None,
+                    ids: str | None = Query(None, description="Comma-separated book ids to fetch in one request."),
+                    book_filter: BookFilter | None = Depends(_get_book_filter),
+                    db: AsyncSession = Depends(get_read_db)) -> Response:
+    if sum(param is not None for param in (offset, cursor, ids)) > 1:
+        raise HTTPException(status_code=400, detail="Use only one of offset, cursor or ids.")
+    if ids is not None:
+        if book_filter is not None:
+            raise HTTPException(status_code=400, detail="ids cannot be combined with genre or author filters.")
+        return FastJSONResponse(await _get_books_batch(ids, db))
+
+    key = await cache_key("list", limit, offset, cursor, book_filter)
+    entry = await get_cached(key, db)
+    if entry is None and is_conditional(request):
+        etag = page_etag(*await get_page_versions(limit, offset, cursor, db, book_filter))
+        if is_not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+    if entry is None:
+        # Rows come back with authors and genres already aggregated, so no ORM objects or validators are involved.
+        if offset is not None:
+            rows, next_cursor = await get_all_books(limit, offset, db, book_filter=book_filter), None
+            body = [book_row_to_dict(row) for row in rows]
+        else:
+            rows, next_cursor = await get_books_page(limit, cursor, db, book_filter=book_filter)
+            body = {"items": [book_row_to_dict(row) for row in rows], "next_cursor": next_cursor}
+        entry = {"etag": page_etag([(row.id, row.version) for row in rows], next_cursor), "body": body}
+        await set_cached(key, entry, db)
+
+    if is_not_modified(request, entry["etag"]):
+        return Response(status_code=304, headers={"ETag": entry["etag"]})
+    return FastJSONResponse(entry["body"], headers={"ETag": entry["etag"]})
+
+
+@router.get("/facets", response_model=BookFacetsResponse)
+async def get_books_facets(limit: int = Query(20, ge=1, le=100, description="Facet values returned per facet."),
+                           book_filter: BookFilter | None = Depends(_get_book_filter),
+                           db: AsyncSession = Depends(get_read_db)) -> dict:
+    return await get_or_load(await cache_key("facets", limit, book_filter),
+                             lambda: get_book_facets(book_filter, db, limit), db)
+
+
+@router.get("/popular", response_model=PopularBooksPageResponse)
+async def get_popular_books(limit: int = Query(20, ge=1, le=100),
+                            cursor: str | None = None,
+                            db: AsyncSession = Depends(get_read_db)) -> Response:
+    # Favorites do not bump the catalog generation, so a cached ranking is at most one cache TTL old.
+    async def load() -> dict:
+        rows, next_cursor = await get_popular_books_page(limit, cursor, db)
+        return {"items": [book_row_to_dict(row) | {"favorites": row.favorites} for row in rows],
+                "next_cursor": next_cursor}
+
+    return FastJSONResponse(await get_or_load(await cache_key("popular", limit, cursor), load, db))
 
 
-@router.get("", response_model=list[BookResponse])
-async def get_books(limit: int, offset: int, db: AsyncSession = Depends(get_db)) -> list[BookResponse]:
-    return [BookResponse.model_validate(book) for book in await get_all_books(limit, offset, db)]
+@router.get("/cache/stats", dependencies=[Depends(get_current_admin)])
+async def get_cache_stats() -> dict:
+    return response_cache.stats()
+
+
+async def _get_books_batch(ids: str, db: AsyncSession) -> list[dict]:
+    try:
+        book_ids = list(dict.fromkeys(int(book_id) for book_id in ids.split(",") if book_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be a comma-separated list of integers.")
+    if len(book_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids can be requested at once.")
+
+    # One generation read and one MGET for the whole batch, then one query and one pipelined write for the misses.
+    keys = dict(zip(book_ids, await cache_keys("book", [(book_id,) for book_id in book_ids])))
+    entries = dict(zip(book_ids, await get_cached_many(list(keys.values()), db)))
+    missing = [book_id for book_id, entry in entries.items() if entry is None]
+    loaded = {row.id: _book_entry(row) for row in await get_books_by_ids(missing, db)} if missing else {}
+    entries.update(loaded)
+    await set_cached_many({keys[book_id]: entry for book_id, entry in loaded.items()}, db)
+    return [entries[book_id]["body"] for book_id in book_ids if entries[book_id] is not None]
+
+
+def _book_entry(row) -> dict:
+    return {"etag": book_etag(row.id, row.version),
+            "last_modified": http_date(row.updated_at),
+            "body": book_row_to_dict(row)}
+
+
+async def _load_book_entry(book_id: int, db: AsyncSession) -> dict:
+    return _book_entry(await get_book_by_id(book_id, db, BookLoading.AGGREGATED))
+
+
+async def _get_book_entry(book_id: int, db: AsyncSession) -> dict:
+    return await get_or_load(await cache_key("book", book_id), lambda: _load_book_entry(book_id, db), db)
 
 
 @router.get("/{book_id}", response_model=BookResponse)
-async def get_book(book_id: int, db: AsyncSession = Depends(get_db)) -> BookResponse:
-    return BookResponse.model_validate(await get_book_by_id(book_id, db))
+async def get_book(book_id: int, request: Request, response: Response,
+                   db: AsyncSession = Depends(get_read_db)) -> dict | Response:
+    key = await cache_key("book", book_id)
+    entry = await get_cached(key, db)
+    if entry is None and is_conditional(request):
+        # Answer revalidations from the version column alone, without loading authors and genres.
+        version, updated_at = await get_book_version(book_id, db)
+        headers = {"ETag": book_etag(book_id, version), "Last-Modified": http_date(updated_at)}
+        if is_not_modified(request, headers["ETag"], headers["Last-Modified"]):
+            return Response(status_code=304, headers=headers)
+
+    if entry is None:
+        entry = await _load_book_entry(book_id, db)
+        await set_cached(key, entry, db)
+
+    headers = {"ETag": entry["etag"], "Last-Modified": entry["last_modified"]}
+    if is_not_modified(request, entry["etag"], entry["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return entry["body"]
 
 
 @router.put("/{book_id}", response_model=BookResponse, dependencies=[Depends(get_current_admin)])
@@ -73,7 +285,7 @@ async def put_book(book_id: int, dto: UpdateBookSchema, db: AsyncSession = Depen
     return BookResponse.model_validate(await update_book(book_id, dto, db))
 
 
-@router.delete("/{book_id}", dependencies=[Depends(get_current_admin)])
-async def delete_book_by_id(book_id: int, db: AsyncSession = Depends(get_db)) -> Response:
+# Returning None rather than a Response lets FastAPI merge the read-your-writes cookie set by get_db.
+@router.delete("/{book_id}", response_class=Response, dependencies=[Depends(get_current_admin)])
+async def delete_book_by_id(book_id: int, db: AsyncSession = Depends(get_db)) -> None:
     await delete_book(book_id, db)
-    return Response(status_code=200)
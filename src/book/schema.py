@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, field_validator
 
 
@@ -30,6 +33,9 @@ class BookResponse(BookSchema):
             return []
         result = []
         for author in v:
+            if isinstance(author, str):
+                result.append(author)
+                continue
             full_name = author.name
             if hasattr(author, "surname") and author.surname:
                 full_name += f" {author.surname}"
@@ -42,7 +48,61 @@ class BookResponse(BookSchema):
     def convert_genres_to_strings(cls, v):
         if not v:
             return []
-        return [genre.name for genre in v]
+        return [genre if isinstance(genre, str) else genre.name for genre in v]
+
+
+class BookPageResponse(BaseModel):
+    items: list[BookResponse]
+    next_cursor: str | None = None
+
+
+class PopularBookResponse(BookResponse):
+    favorites: int
+
+
+class PopularBooksPageResponse(BaseModel):
+    items: list[PopularBookResponse]
+    next_cursor: str | None = None
+
+
+class BookFilter(BaseModel):
+    genres: list[str] = []
+    authors: list[str] = []
+    match: Literal["all", "any"] = "all"
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class BookFacetsResponse(BaseModel):
+    total: int
+    genres: list[FacetCount]
+    authors: list[FacetCount]
+
+
+class BulkImportError(BaseModel):
+    row: int
+    detail: str
+
+
+class BulkImportResponse(BaseModel):
+    imported: int
+    failed: int
+    errors: list[BulkImportError]
+
+
+class ExportJobResponse(BaseModel):
+    id: str
+    format: str
+    status: Literal["running", "done", "failed"]
+    rows_written: int
+    total_rows: int | None
+    created_at: datetime
+    finished_at: datetime | None
+    error: str | None
+    download_url: str | None
 
 
 class FavoriteBooksSchema(BaseModel):
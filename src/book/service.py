@@ -1,144 +1,494 @@
+import base64
+import binascii
 import csv
+import enum
 import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable
 
 from fastapi import HTTPException
-from sqlalchemy import select, Sequence
+from sqlalchemy import select, Sequence, Select, update, delete, func, or_, literal, tuple_, \
+    union_all, String, exists, cast, BigInteger, text
+from sqlalchemy.dialects.postgresql import insert, aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, joinedload
 
-from src.book.model import Book, Author, Genre
-from src.book.schema import UpdateBookSchema, CreateBookSchema
-from src.user.service import get_user_by_id
+from src.book.cache import invalidate_books
+from src.book.model import Book, Author, Genre, BookPopularity, BookChange, book_authors, book_genres
+from src.book.schema import UpdateBookSchema, CreateBookSchema, BookFilter
+from src.user.model import user_books
 
 NOT_FOUND = "Book not found."
+INVALID_CURSOR = "Invalid cursor."
+CSV_HEADER = ['ID', 'Title', 'Description', 'Authors', 'Genres']
+CSV_EXPORT_BATCH_SIZE = 1000
+SEARCH_CONFIG = "simple"
+FACET_LIMIT = 20
+
+
+def split_author_name(fullname: str) -> tuple[str, str]:
+    parts = fullname.split(maxsplit=1)
+    if len(parts) != 2:
+        raise HTTPException(status_code=400, detail=f"Author '{fullname}' must have a name and a surname.")
+    return parts[0], parts[1]
+
+
+async def resolve_keys(target, key_columns: list, keys: Iterable[tuple], db: AsyncSession) -> dict[tuple, Any]:
+    # Maps each key (values of key_columns, a unique constraint) to target, an entity or one of its columns,
+    # inserting the rows that do not exist yet.
+    keys = list(dict.fromkeys(keys))
+    resolved: dict[tuple, Any] = {}
+
+    async def collect(query) -> list[tuple]:
+        for value, *key in await db.execute(query):
+            resolved[tuple(key)] = value
+        return [key for key in keys if key not in resolved]
+
+    def lookup(missing: list[tuple]) -> Select:
+        return select(target, *key_columns).where(tuple_(*key_columns).in_(missing))
+
+    missing = await collect(lookup(keys)) if keys else []
+    if missing:
+        names = [column.key for column in key_columns]
+        missing = await collect(
+            insert(key_columns[0].class_).values([dict(zip(names, key)) for key in missing])
+            .on_conflict_do_nothing(index_elements=key_columns).returning(target, *key_columns)
+        )
+    # Rows inserted by a concurrent transaction between our SELECT and INSERT are not returned by ON CONFLICT.
+    if missing:
+        await collect(lookup(missing))
+    return resolved
+
+
+async def resolve_authors(fullnames: list[str], db: AsyncSession) -> list[Author]:
+    keys = list(dict.fromkeys(split_author_name(fullname) for fullname in fullnames))
+    authors = await resolve_keys(Author, [Author.name, Author.surname], keys, db)
+    return [authors[key] for key in keys]
+
+
+async def resolve_genres(names: list[str], db: AsyncSession) -> list[Genre]:
+    keys = [(name,) for name in dict.fromkeys(names)]
+    genres = await resolve_keys(Genre, [Genre.name], keys, db)
+    return [genres[key] for key in keys]
 
 
 async def create_book(dto: CreateBookSchema, db: AsyncSession) -> Book:
-    book = Book(title=dto.title, description=dto.description)
-    for author in dto.authors:
-        name, surname = author.split(maxsplit=1)
-        query = select(Author).where(Author.name == name, Author.surname == surname)
-        result = await db.execute(query)
-        author = result.scalar_one_or_none()
-        if author:
-            book.authors.append(author)
-        else:
-            book.authors.append(Author(name=name, surname=surname))
-
-    for genre_name in dto.genres:
-        query = select(Genre).where(Genre.name == genre_name)
-        result = await db.execute(query)
-        genre = result.scalar_one_or_none()
-        if genre:
-            book.genres.append(genre)
-        else:
-            book.genres.append(Genre(name=genre_name))
+    book = Book(title=dto.title, description=dto.description,
+                authors=await resolve_authors(dto.authors, db),
+                genres=await resolve_genres(dto.genres, db))
 
     db.add(book)
     await db.commit()
+    await invalidate_books()
     return book
 
 
-async def get_all_books(limit: int, offset: int, db: AsyncSession) -> Sequence[Book]:
-    query = select(Book).offset(offset).limit(limit).options(
-        selectinload(Book.authors), selectinload(Book.genres)
-    )
-    result = await db.execute(query)
-    return result.scalars().all()
+class BookLoading(str, enum.Enum):
+    # Book entities plus one extra SELECT per relationship.
+    SELECTIN = "selectin"
+    # Book entities with authors and genres LEFT JOINed in the same statement.
+    JOINED = "joined"
+    # Plain rows with author and genre names aggregated into arrays, one statement and no ORM objects.
+    AGGREGATED = "aggregated"
 
 
-async def get_books_by_title(title: str, db: AsyncSession) -> Sequence[Book]:
-    query = select(Book).where(Book.title.ilike(f"%{title}%")).options(
-        selectinload(Book.authors), selectinload(Book.genres)
-    )
+def book_query(loading: BookLoading = BookLoading.AGGREGATED) -> Select:
+    if loading == BookLoading.AGGREGATED:
+        authors = select(
+            func.array_agg(aggregate_order_by(Author.name + " " + Author.surname, Author.id))
+        ).join(book_authors, book_authors.c.author_id == Author.id).where(
+            book_authors.c.book_id == Book.id
+        ).scalar_subquery()
+        genres = select(
+            func.array_agg(aggregate_order_by(Genre.name, Genre.id))
+        ).join(book_genres, book_genres.c.genre_id == Genre.id).where(
+            book_genres.c.book_id == Book.id
+        ).scalar_subquery()
+        return select(Book.id, Book.title, Book.description, Book.version, Book.updated_at,
+                      authors.label("authors"), genres.label("genres"))
+    if loading == BookLoading.JOINED:
+        return select(Book).options(joinedload(Book.authors), joinedload(Book.genres))
+    return select(Book).options(selectinload(Book.authors), selectinload(Book.genres))
+
+
+async def fetch_books(query: Select, loading: BookLoading, db: AsyncSession) -> Sequence:
     result = await db.execute(query)
+    if loading == BookLoading.AGGREGATED:
+        return result.all()
+    if loading == BookLoading.JOINED:
+        return result.unique().scalars().all()
     return result.scalars().all()
 
 
-async def get_book_by_id(book_id: int, db: AsyncSession) -> Book:
-    query = select(Book).where(Book.id == book_id).options(
-        selectinload(Book.authors), selectinload(Book.genres)
-    )
+def book_row_to_dict(row) -> dict:
+    return {
+        "title": row.title,
+        "description": row.description,
+        "authors": row.authors or [],
+        "genres": row.genres or [],
+        "id": row.id,
+    }
+
+
+def _books_matching(link_table, condition, count: int, match: str) -> Select:
+    # The association primary keys lead with genre_id/author_id, so these lookups are index scans.
+    query = select(link_table.c.book_id).where(condition)
+    if match == "all" and count > 1:
+        query = query.group_by(link_table.c.book_id).having(func.count() == count)
+    return query
+
+
+def filter_books(query: Select, book_filter: BookFilter | None) -> Select:
+    if book_filter is None:
+        return query
+    genres = set(book_filter.genres)
+    if genres:
+        genre_ids = select(Genre.id).where(Genre.name.in_(genres))
+        query = query.where(Book.id.in_(
+            _books_matching(book_genres, book_genres.c.genre_id.in_(genre_ids), len(genres),
+                            book_filter.match)
+        ))
+    authors = {split_author_name(author) for author in book_filter.authors}
+    if authors:
+        author_ids = select(Author.id).where(tuple_(Author.name, Author.surname).in_(authors))
+        query = query.where(Book.id.in_(
+            _books_matching(book_authors, book_authors.c.author_id.in_(author_ids), len(authors),
+                            book_filter.match)
+        ))
+    return query
+
+
+async def get_all_books(limit: int, offset: int, db: AsyncSession,
+                        loading: BookLoading = BookLoading.AGGREGATED,
+                        book_filter: BookFilter | None = None) -> Sequence:
+    query = filter_books(book_query(loading), book_filter).order_by(Book.id).offset(offset).limit(limit)
+    return await fetch_books(query, loading, db)
+
+
+def encode_cursor(*parts: int) -> str:
+    return base64.urlsafe_b64encode(":".join(map(str, parts)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple[int, ...]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        parts = tuple(int(part) for part in base64.urlsafe_b64decode(padded.encode()).decode().split(":"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail=INVALID_CURSOR)
+    if len(parts) != size:
+        raise HTTPException(status_code=400, detail=INVALID_CURSOR)
+    return parts
+
+
+def _paginate(books: Sequence, limit: int) -> tuple[Sequence, str | None]:
+    if len(books) > limit:
+        return books[:limit], encode_cursor(books[limit - 1].id)
+    return books, None
+
+
+async def get_books_page(limit: int, cursor: str | None, db: AsyncSession,
+                         loading: BookLoading = BookLoading.AGGREGATED,
+                         book_filter: BookFilter | None = None) -> tuple[Sequence, str | None]:
+    query = filter_books(book_query(loading), book_filter).order_by(Book.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(Book.id > decode_cursor(cursor, 1)[0])
+    return _paginate(await fetch_books(query, loading, db), limit)
+
+
+async def get_books_by_ids(book_ids: list[int], db: AsyncSession,
+                           loading: BookLoading = BookLoading.AGGREGATED) -> list:
+    books = {book.id: book for book in await fetch_books(book_query(loading).where(Book.id.in_(book_ids)), loading, db)}
+    return [books[book_id] for book_id in book_ids if book_id in books]
+
+
+async def get_book_version(book_id: int, db: AsyncSession) -> tuple[int, datetime]:
+    query = select(Book.version, Book.updated_at).where(Book.id == book_id)
     result = await db.execute(query)
-    book = result.scalar_one_or_none()
-    if book is None:
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=404, detail=NOT_FOUND)
-    return book
+    return row.version, row.updated_at
+
 
+async def get_page_versions(limit: int, offset: int | None, cursor: str | None, db: AsyncSession,
+                            book_filter: BookFilter | None = None) -> tuple[Sequence[tuple[int, int]], str | None]:
+    query = filter_books(select(Book.id, Book.version), book_filter).order_by(Book.id)
+    if offset is not None:
+        result = await db.execute(query.offset(offset).limit(limit))
+        return result.tuples().all(), None
 
-async def get_favorite_books_by_user_id(user_id: int, db: AsyncSession) -> Sequence[Book]:
-    user = await get_user_by_id(user_id, db)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found.")
-    return user.favorite_books
+    query = query.limit(limit + 1)
+    if cursor is not None:
+        query = query.where(Book.id > decode_cursor(cursor, 1)[0])
+    result = await db.execute(query)
+    versions = result.tuples().all()
+    if len(versions) > limit:
+        return versions[:limit], encode_cursor(versions[limit - 1][0])
+    return versions, None
 
 
-async def add_book_to_favorite(user_id: int, book_id: int, db: AsyncSession) -> Book:
-    user = await get_user_by_id(user_id, db)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found.")
+async def get_book_facets(book_filter: BookFilter | None, db: AsyncSession, limit: int = FACET_LIMIT) -> dict:
+    # One statement: the matching ids are computed once and every facet is aggregated from them.
+    matched = filter_books(select(Book.id), book_filter).cte("matched")
+    genre_count = func.count().label("count")
+    genres = select(literal("genre").label("facet"), Genre.name.label("value"), genre_count).select_from(
+        matched
+    ).join(book_genres, book_genres.c.book_id == matched.c.id).join(
+        Genre, Genre.id == book_genres.c.genre_id
+    ).group_by(Genre.id, Genre.name).order_by(genre_count.desc(), Genre.name).limit(limit).subquery()
+    author_count = func.count().label("count")
+    authors = select(literal("author").label("facet"), (Author.name + " " + Author.surname).label("value"),
+                     author_count).select_from(
+        matched
+    ).join(book_authors, book_authors.c.book_id == matched.c.id).join(
+        Author, Author.id == book_authors.c.author_id
+    ).group_by(Author.id, Author.name, Author.surname).order_by(
+        author_count.desc(), Author.name, Author.surname
+    ).limit(limit).subquery()
+    total = select(literal("total").label("facet"), literal(None, String).label("value"),
+                   func.count().label("count")).select_from(matched)
 
-    book = await get_book_by_id(book_id, db)
-    if book is None:
+    result = await db.execute(union_all(select(genres), select(authors), total))
+    facets = {"total": 0, "genres": [], "authors": []}
+    for row in result:
+        if row.facet == "total":
+            facets["total"] = row.count
+        else:
+            facets[f"{row.facet}s"].append({"value": row.value, "count": row.count})
+    for key in ("genres", "authors"):
+        facets[key].sort(key=lambda facet: (-facet["count"], facet["value"]))
+    return facets
+
+
+async def find_books(text: str, limit: int, db: AsyncSession,
+                     loading: BookLoading = BookLoading.AGGREGATED) -> Sequence:
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, text)
+    rank = func.ts_rank(Book.search_vector, ts_query) + func.similarity(Book.title, literal(text))
+    query = book_query(loading).where(
+        or_(Book.search_vector.op("@@")(ts_query), Book.title.icontains(text, autoescape=True))
+    ).order_by(rank.desc(), Book.id).limit(limit)
+    return await fetch_books(query, loading, db)
+
+
+async def get_book_by_id(book_id: int, db: AsyncSession, loading: BookLoading = BookLoading.JOINED):
+    books = await fetch_books(book_query(loading).where(Book.id == book_id), loading, db)
+    if not books:
         raise HTTPException(status_code=404, detail=NOT_FOUND)
+    return books[0]
+
 
-    user.favorite_books.append(book)
+async def get_favorite_book_ids(user_id: int, db: AsyncSession) -> Sequence[int]:
+    query = select(user_books.c.book_id).where(user_books.c.user_id == user_id).order_by(user_books.c.book_id)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
+async def get_favorite_books_page(user_id: int, limit: int, cursor: str | None, db: AsyncSession,
+                                  loading: BookLoading = BookLoading.AGGREGATED) -> tuple[Sequence, str | None]:
+    query = book_query(loading).join(user_books, user_books.c.book_id == Book.id).where(
+        user_books.c.user_id == user_id
+    ).order_by(Book.id).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(Book.id > decode_cursor(cursor, 1)[0])
+    return _paginate(await fetch_books(query, loading, db), limit)
+
+
+async def add_book_to_favorite(user_id: int, book_id: int, db: AsyncSession) -> bool:
+    # The favorite and its popularity increment are written by one statement, and only when the row is new.
+    inserted = insert(user_books).from_select(
+        ["user_id", "book_id"], select(literal(user_id), Book.id).where(Book.id == book_id)
+    ).on_conflict_do_nothing().returning(user_books.c.book_id).cte("inserted")
+    counted = insert(BookPopularity).from_select(
+        ["book_id", "favorites"], select(inserted.c.book_id, literal(1))
+    ).on_conflict_do_update(
+        index_elements=[BookPopularity.book_id], set_={"favorites": BookPopularity.favorites + 1}
+    ).cte("counted")
+    result = await db.execute(select(inserted.c.book_id).add_cte(counted))
+    added = result.scalar_one_or_none() is not None
     await db.commit()
-    return book
+    return added
 
 
-async def remove_book_from_favorite(user_id: int, book_id: int, db: AsyncSession) -> Book:
-    try:
-        user = await get_user_by_id(user_id, db)
-        if user is None:
-            raise HTTPException(status_code=404, detail="User not found.")
-        book = await get_book_by_id(book_id, db)
-        if book is None:
-            raise HTTPException(status_code=404, detail=NOT_FOUND)
-        user.favorite_books.remove(book)
-    except ValueError:
-        raise HTTPException(status_code=404, detail="Book is not in your favorite list.")
+async def remove_book_from_favorite(user_id: int, book_id: int, db: AsyncSession) -> bool:
+    deleted = delete(user_books).where(
+        user_books.c.user_id == user_id, user_books.c.book_id == book_id
+    ).returning(user_books.c.book_id).cte("deleted")
+    counted = update(BookPopularity).where(
+        BookPopularity.book_id.in_(select(deleted.c.book_id))
+    ).values(favorites=BookPopularity.favorites - 1).cte("counted")
+    result = await db.execute(select(deleted.c.book_id).add_cte(counted))
+    removed = result.scalar_one_or_none() is not None
     await db.commit()
-    return book
+    return removed
+
+
+async def get_popular_books_page(limit: int, cursor: str | None, db: AsyncSession) -> tuple[Sequence, str | None]:
+    # Walks ix_book_popularity_rank backwards, so a page costs O(limit) regardless of how many favorites exist.
+    query = book_query(BookLoading.AGGREGATED).add_columns(BookPopularity.favorites).join(
+        BookPopularity, BookPopularity.book_id == Book.id
+    ).where(BookPopularity.favorites > 0).order_by(
+        BookPopularity.favorites.desc(), BookPopularity.book_id.desc()
+    ).limit(limit + 1)
+    if cursor is not None:
+        query = query.where(
+            tuple_(BookPopularity.favorites, BookPopularity.book_id) < decode_cursor(cursor, 2)
+        )
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1].favorites, rows[limit - 1].id)
+    return rows, None
+
+
+async def rebuild_popularity(db: AsyncSession) -> int:
+    # Recounts from user_books, fixing any drift (e.g. favorites removed by deleting a user).
+    counts = select(user_books.c.book_id, func.count().label("favorites")).group_by(user_books.c.book_id)
+    upsert = insert(BookPopularity).from_select(["book_id", "favorites"], counts)
+    await db.execute(upsert.on_conflict_do_update(
+        index_elements=[BookPopularity.book_id], set_={"favorites": upsert.excluded.favorites}
+    ))
+    await db.execute(update(BookPopularity).where(
+        BookPopularity.favorites != 0, ~exists().where(user_books.c.book_id == BookPopularity.book_id)
+    ).values(favorites=0))
+    total = await db.scalar(select(func.count()).where(BookPopularity.favorites > 0))
+    await db.commit()
+    return total
 
 
 async def delete_book(book_id: int, db: AsyncSession) -> None:
     book = await get_book_by_id(book_id, db)
     await db.delete(book)
     await db.commit()
+    await invalidate_books()
 
 
 async def update_book(book_id: int, dto: UpdateBookSchema, db: AsyncSession) -> Book:
     book = await get_book_by_id(book_id, db)
-    if book is None:
-        raise HTTPException(status_code=404, detail=NOT_FOUND)
 
     update_data = dto.model_dump(exclude_unset=True, exclude_none=True)
+    if "authors" in update_data:
+        update_data["authors"] = await resolve_authors(update_data["authors"], db)
+    if "genres" in update_data:
+        update_data["genres"] = await resolve_genres(update_data["genres"], db)
     for key, value in update_data.items():
         setattr(book, key, value)
+    # Incremented in SQL, so concurrent updates serialize on the row lock and each gets its own version (and ETag).
+    book.version = Book.version + 1
+    # The database clock, like the server default, so timestamps from different app servers stay ordered.
+    book.updated_at = func.now()
 
     await db.commit()
+    await invalidate_books()
     await db.refresh(book)
     return book
 
 
+def _csv_writer(output: io.StringIO):
+    return csv.writer(output, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+
+def _book_to_csv_row(book: Book) -> list:
+    authors_str = ", ".join([f"{a.name} {getattr(a, 'surname', '')}".strip() for a in book.authors])
+    genres_str = ", ".join([g.name for g in book.genres])
+    return [book.id, book.title, book.description or "", authors_str, genres_str]
+
+
+def _row_to_csv_row(row) -> list:
+    return [row.id, row.title, row.description or "", ", ".join(row.authors or []), ", ".join(row.genres or [])]
+
+
 async def load_books_to_csv(db: AsyncSession):
     query = select(Book).options(selectinload(Book.authors), selectinload(Book.genres))
     result = await db.execute(query)
     books = result.scalars().all()
 
     output = io.StringIO()
-    writer = csv.writer(output, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL)
-    writer.writerow(['ID', 'Title', 'Description', 'Authors', 'Genres'])
+    writer = _csv_writer(output)
+    writer.writerow(CSV_HEADER)
     for book in books:
-        authors_str = ", ".join([f"{a.name} {getattr(a, 'surname', '')}".strip() for a in book.authors])
-        genres_str = ", ".join([g.name for g in book.genres])
-
-        writer.writerow([
-            book.id,
-            book.title,
-            book.description or "",
-            authors_str,
-            genres_str
-        ])
+        writer.writerow(_book_to_csv_row(book))
     return output.getvalue()
+
+
+def _csv_text(rows: Iterable[list]) -> str:
+    output = io.StringIO()
+    _csv_writer(output).writerows(rows)
+    return output.getvalue()
+
+
+def csv_header() -> str:
+    return _csv_text([CSV_HEADER])
+
+
+def rows_to_csv(rows: Sequence) -> str:
+    return _csv_text(_row_to_csv_row(row) for row in rows)
+
+
+def rows_to_ndjson(rows: Sequence) -> str:
+    return "".join(json.dumps(book_row_to_dict(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+async def iter_book_row_batches(db: AsyncSession, batch_size: int = CSV_EXPORT_BATCH_SIZE) -> AsyncIterator[Sequence]:
+    query = book_query(BookLoading.AGGREGATED).order_by(Book.id).execution_options(yield_per=batch_size)
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def stream_books_csv(db: AsyncSession, batch_size: int = CSV_EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    yield csv_header()
+    async for rows in iter_book_row_batches(db, batch_size):
+        yield rows_to_csv(rows)
+
+
+async def begin_snapshot(db: AsyncSession) -> None:
+    # Must run before the transaction's first query; every statement after it then reads the same snapshot.
+    await db.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ"))
+
+
+async def get_catalog_fingerprint(db: AsyncSession) -> tuple[str, int]:
+    # Every write to books appends to book_changes, so the newest change id moves with each one. Change ids
+    # can commit out of order, so the count and the version sum still catch a lower id committing late.
+    books = select(func.count(Book.id), func.coalesce(func.sum(Book.version), 0)).subquery()
+    last_change = select(func.max(BookChange.id)).scalar_subquery()
+    result = await db.execute(select(books, last_change))
+    count, versions, last_change = result.one()
+    return f"{count}:{versions}:{last_change or 0}", count
+
+
+def _change_to_dict(row) -> dict:
+    return {
+        "cursor": encode_cursor(row.transaction_id, row.change_id),
+        "operation": row.operation,
+        "book_id": row.book_id,
+        "changed_at": row.changed_at.isoformat(),
+        # None for tombstones, and for earlier changes of a book that has since been deleted.
+        "book": book_row_to_dict(row) if row.id is not None else None,
+    }
+
+
+def rows_to_change_ndjson(rows: Sequence) -> str:
+    return "".join(json.dumps(_change_to_dict(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+async def stream_book_changes(since: tuple[int, int] | None, limit: int, db: AsyncSession,
+                              batch_size: int = CSV_EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    # Change ids are taken before commit, so a slow transaction can commit a lower id after a consumer has
+    # moved past it. Ordering by the writing transaction and stopping below the oldest one still running
+    # (the snapshot xmin) means everything behind a cursor is final. Each change carries the current
+    # state of its book, so consumers only ever apply the latest version.
+    oldest_running = select(
+        cast(cast(func.pg_snapshot_xmin(func.pg_current_snapshot()), String), BigInteger)
+    ).scalar_subquery()
+    books = book_query(BookLoading.AGGREGATED).subquery()
+    query = select(
+        BookChange.id.label("change_id"), BookChange.transaction_id, BookChange.operation, BookChange.book_id,
+        BookChange.changed_at, books.c.id, books.c.title, books.c.description, books.c.authors, books.c.genres
+    ).outerjoin(books, books.c.id == BookChange.book_id).where(
+        BookChange.transaction_id < oldest_running
+    ).order_by(BookChange.transaction_id, BookChange.id).limit(limit)
+    if since is not None:
+        query = query.where(tuple_(BookChange.transaction_id, BookChange.id) > since)
+    result = await db.stream(query.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows_to_change_ndjson(rows)
@@ -0,0 +1,182 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from src.config import cache_settings
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Any | None: ...
+
+    async def set(self, key: str, value: Any, ttl: int) -> None: ...
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]: ...
+
+    async def set_many(self, values: dict[str, Any], ttl: int) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+
+class MemoryCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        # Counters live outside the LRU so a generation number is never evicted and reset.
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> Any | None:
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, values: dict[str, Any], ttl: int) -> None:
+        for key, value in values.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class SharedCache:
+    def __init__(self, client, prefix: str = "library:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any | None:
+        value = await self.client.get(self.prefix + key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        await self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        # One MGET round trip however many keys are asked for.
+        if not keys:
+            return []
+        values = await self.client.mget([self.prefix + key for key in keys])
+        return [None if value is None else json.loads(value) for value in values]
+
+    async def set_many(self, values: dict[str, Any], ttl: int) -> None:
+        if not values:
+            return
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(self.prefix + key, json.dumps(value), ex=ttl)
+            await pipe.execute()
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*[self.prefix + key for key in keys])
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(self.prefix + key)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend | None, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    async def get(self, key: str) -> Any | None:
+        if self.backend is None:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        if self.backend is None:
+            return [None] * len(keys)
+        values = await self.backend.get_many(keys)
+        found = sum(value is not None for value in values)
+        self.hits += found
+        self.misses += len(values) - found
+        return values
+
+    async def set(self, key: str, value: Any) -> None:
+        if self.backend is not None:
+            await self.backend.set(key, value, self.ttl)
+
+    async def set_many(self, values: dict[str, Any]) -> None:
+        if self.backend is not None:
+            await self.backend.set_many(values, self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if self.backend is not None:
+            await self.backend.delete(*keys)
+
+    async def mark(self, key: str, seconds: int) -> None:
+        if self.backend is not None and seconds > 0:
+            await self.backend.set(key, True, seconds)
+
+    async def is_marked(self, key: str) -> bool:
+        return self.backend is not None and await self.backend.get(key) is not None
+
+    async def generation(self, namespace: str) -> int:
+        if self.backend is None:
+            return 0
+        return int(await self.backend.get(f"{namespace}:generation") or 0)
+
+    async def bump_generation(self, namespace: str) -> None:
+        if self.backend is not None:
+            await self.backend.incr(f"{namespace}:generation")
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": cache_settings.CACHE_BACKEND,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_backend() -> CacheBackend | None:
+    if cache_settings.CACHE_BACKEND == "memory":
+        return MemoryCache(cache_settings.CACHE_MAX_ENTRIES)
+    if cache_settings.CACHE_BACKEND == "redis":
+        try:
+            from redis import asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package to be installed.")
+        return SharedCache(redis.from_url(cache_settings.CACHE_URL))
+    if cache_settings.CACHE_BACKEND == "none":
+        return None
+    raise RuntimeError(f"Unknown CACHE_BACKEND '{cache_settings.CACHE_BACKEND}'.")
+
+
+response_cache = ResponseCache(create_backend(), cache_settings.CACHE_TTL_SECONDS)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -9,11 +11,26 @@ class DBSettings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    DB_POOL_SIZE: int = Field(5)
+    DB_MAX_OVERFLOW: int = Field(10)
+    DB_POOL_TIMEOUT: float = Field(30)
+    DB_POOL_RECYCLE: int = Field(1800)
+    DB_POOL_PRE_PING: bool = Field(True)
+    DB_STATEMENT_CACHE_SIZE: int = Field(100)
+    DB_STATEMENT_TIMEOUT_MS: int = Field(0)
+    DB_PGBOUNCER: bool = Field(False)
+    DB_REPLICA_URLS: str = Field("")
+    DB_REPLICA_RETRY_SECONDS: int = Field(30)
+    DB_READ_YOUR_WRITES_SECONDS: int = Field(10)
 
     @property
     def database_url(self):
         return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASS}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def replica_urls(self) -> list[str]:
+        return [url.strip() for url in self.DB_REPLICA_URLS.split(",") if url.strip()]
+
 
 class JWTSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
@@ -22,7 +39,73 @@ class JWTSettings(BaseSettings):
     REFRESH_TOKEN_EXPIRE_DAYS: int
     REFRESH_TOKEN_SECRET: str
     ALGORITHM: str = Field("HS256")
+    STATELESS_AUTH: bool = Field(True)
+    USER_CACHE_TTL_SECONDS: int = Field(30)
+
+
+class HashSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    ARGON2_TIME_COST: int = Field(2)
+    ARGON2_MEMORY_COST: int = Field(102400)
+    ARGON2_PARALLELISM: int = Field(8)
+    HASH_WORKERS: int = Field(2)
+    HASH_MAX_PENDING: int = Field(32)
+
+
+class CacheSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    CACHE_BACKEND: Literal["memory", "redis", "none"] = Field("memory")
+    CACHE_URL: str = Field("redis://localhost:6379/0")
+    CACHE_TTL_SECONDS: int = Field(60)
+    CACHE_MAX_ENTRIES: int = Field(10000)
+
+
+class ExportSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    EXPORT_DIR: str = Field("exports")
+    EXPORT_BATCH_SIZE: int = Field(1000)
+    # A running export whose lock file has not been touched for this long is considered abandoned.
+    EXPORT_STALE_SECONDS: int = Field(300)
+
+
+class RateLimitSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    RATE_LIMIT_BACKEND: Literal["memory", "redis", "none"] = Field("memory")
+    RATE_LIMIT_URL: str = Field("redis://localhost:6379/1")
+    # Token buckets: CAPACITY requests in a burst, refilled at PER_MINUTE tokens per minute.
+    RATE_LIMIT_IP_CAPACITY: int = Field(20)
+    RATE_LIMIT_IP_PER_MINUTE: float = Field(10)
+    RATE_LIMIT_EMAIL_CAPACITY: int = Field(5)
+    RATE_LIMIT_EMAIL_PER_MINUTE: float = Field(1)
+    RATE_LIMIT_MAX_BUCKETS: int = Field(100000)
+
+
+class MetricsSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    SLOW_REQUEST_MS: int = Field(500)
+    SERVER_TIMING: bool = Field(True)
+
+
+class ServerSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+    SERVER_HOST: str = Field("0.0.0.0")
+    SERVER_PORT: int = Field(8000)
+    # 0 sizes the worker count from the CPUs available to the container.
+    WEB_CONCURRENCY: int = Field(0)
+    SERVER_LOOP: Literal["auto", "asyncio", "uvloop"] = Field("auto")
+    SERVER_HTTP: Literal["auto", "h11", "httptools"] = Field("auto")
+    # Ignored with a single worker, which has no supervisor to replace it.
+    WORKER_MAX_REQUESTS: int = Field(10000)
+    GRACEFUL_SHUTDOWN_SECONDS: int = Field(30)
+    # Connections this deployment may open per database server, shared by all workers; 0 leaves pools as configured.
+    DB_MAX_CONNECTIONS: int = Field(0)
 
 
 db_settings = DBSettings()
 jwt_settings = JWTSettings()
+hash_settings = HashSettings()
+cache_settings = CacheSettings()
+export_settings = ExportSettings()
+rate_limit_settings = RateLimitSettings()
+metrics_settings = MetricsSettings()
+server_settings = ServerSettings()
@@ -1,18 +1,188 @@
+import time
+import uuid
+from dataclasses import dataclass
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from src.config import db_settings
+from src.metrics import record_pool_wait, instrument_engine
 
-engine = create_async_engine(url=db_settings.database_url)
+
+@dataclass
+class PoolMetrics:
+    checkouts: int = 0
+    failures: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record(self, wait: float, failed: bool = False) -> None:
+        self.checkouts += 1
+        self.failures += failed
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            wait = time.perf_counter() - started
+            self.metrics.record(wait, failed=True)
+            record_pool_wait(wait)
+            raise
+        wait = time.perf_counter() - started
+        self.metrics.record(wait)
+        record_pool_wait(wait)
+        return connection
+
+
+def _connect_args(url: str) -> dict:
+    if not url.startswith("postgresql+asyncpg"):
+        return {}
+    connect_args = {"prepared_statement_cache_size": db_settings.DB_STATEMENT_CACHE_SIZE}
+    if db_settings.DB_PGBOUNCER:
+        # PgBouncer in transaction mode can route each statement to a different server connection,
+        # so prepared statements must not be cached and need unique names.
+        connect_args.update({
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        })
+    elif db_settings.DB_STATEMENT_TIMEOUT_MS:
+        connect_args["server_settings"] = {"statement_timeout": str(db_settings.DB_STATEMENT_TIMEOUT_MS)}
+    return connect_args
+
+
+def create_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url=url,
+        poolclass=InstrumentedPool,
+        pool_size=db_settings.DB_POOL_SIZE,
+        max_overflow=db_settings.DB_MAX_OVERFLOW,
+        pool_timeout=db_settings.DB_POOL_TIMEOUT,
+        pool_recycle=db_settings.DB_POOL_RECYCLE,
+        pool_pre_ping=db_settings.DB_POOL_PRE_PING,
+        connect_args=_connect_args(url),
+    )
+    instrument_engine(new_engine)
+    return new_engine
+
+
+def pool_status(target: AsyncEngine) -> dict:
+    pool = target.pool
+    metrics = pool.metrics
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checked_in": pool.checkedin(),
+        "checkouts": metrics.checkouts,
+        "failures": metrics.failures,
+        "wait_seconds_total": metrics.total_wait,
+        "wait_seconds_max": metrics.max_wait,
+        "wait_seconds_avg": metrics.total_wait / metrics.checkouts if metrics.checkouts else 0.0,
+    }
+
+
+engine = create_engine(db_settings.database_url)
 session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+if db_settings.DB_PGBOUNCER and db_settings.DB_STATEMENT_TIMEOUT_MS:
+    # PgBouncer does not forward startup parameters, so the timeout is set for each transaction instead.
+    @event.listens_for(Session, "after_begin")
+    def set_statement_timeout(session, transaction, connection):
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {db_settings.DB_STATEMENT_TIMEOUT_MS}")
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str]):
+        self.engines = [create_engine(url) for url in urls]
+        self.session_makers = [
+            async_sessionmaker(replica, class_=AsyncSession, expire_on_commit=False) for replica in self.engines
+        ]
+        self._next = 0
+        self._unhealthy_until = [0.0] * len(self.engines)
+
+    def _candidates(self) -> list[int]:
+        now = time.monotonic()
+        order = [(self._next + i) % len(self.engines) for i in range(len(self.engines))]
+        self._next = (self._next + 1) % len(self.engines) if self.engines else 0
+        return [index for index in order if self._unhealthy_until[index] <= now]
+
+    async def open_session(self) -> AsyncSession | None:
+        for index in self._candidates():
+            session = self.session_makers[index]()
+            try:
+                await session.connection()
+            except (DBAPIError, OSError):
+                await session.close()
+                self._unhealthy_until[index] = time.monotonic() + db_settings.DB_REPLICA_RETRY_SECONDS
+                continue
+            return session
+        return None
+
+    def status(self) -> list[dict]:
+        now = time.monotonic()
+        return [{"url": replica.url.render_as_string(hide_password=True),
+                 "healthy": self._unhealthy_until[index] <= now,
+                 **pool_status(replica)}
+                for index, replica in enumerate(self.engines)]
+
+
+replicas = ReplicaSet(db_settings.replica_urls)
+
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+# session.info flags set by get_read_db.
+PINNED_TO_PRIMARY = "pinned_to_primary"
+FROM_REPLICA = "from_replica"
+
 
 class Base(DeclarativeBase):
     pass
 
 
-async def get_db() -> AsyncGenerator:
+async def get_db(response: Response) -> AsyncGenerator:
     async with session_maker() as session:
+        if replicas.engines:
+            # Pin this client's reads to the primary for a while so it sees its own writes despite replica lag.
+            @event.listens_for(session.sync_session, "after_commit", once=True)
+            def pin_reads_to_primary(_):
+                primary_until = int(time.time()) + db_settings.DB_READ_YOUR_WRITES_SECONDS
+                response.set_cookie(PRIMARY_UNTIL_COOKIE, str(primary_until),
+                                    max_age=db_settings.DB_READ_YOUR_WRITES_SECONDS, httponly=True, samesite="lax")
+
+        yield session
+
+
+def _reads_pinned_to_primary(request: Request) -> bool:
+    try:
+        return int(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def get_read_db(request: Request) -> AsyncGenerator:
+    session = None
+    pinned = bool(replicas.engines) and _reads_pinned_to_primary(request)
+    if replicas.engines and not pinned:
+        session = await replicas.open_session()
+    from_replica = session is not None
+    if session is None:
+        session = session_maker()
+    session.info.update({PINNED_TO_PRIMARY: pinned, FROM_REPLICA: from_replica})
+    async with session:
         yield session
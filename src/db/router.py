@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.params import Depends
+
+from src.auth.dependencies import get_current_admin
+from src.db.database import engine, pool_status, replicas
+
+router = APIRouter(prefix="/api/db", tags=["Database"], dependencies=[Depends(get_current_admin)])
+
+
+@router.get("/pool")
+async def get_pool_status() -> dict:
+    return {"primary": pool_status(engine), "replicas": replicas.status()}
@@ -0,0 +1,112 @@
+import asyncio
+import logging
+
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from src.auth.security import get_password_hash, verify_password
+from src.book.schema import BookResponse, CreateBookSchema
+from src.book.service import BookLoading, get_all_books, get_books_page, get_book_by_id, get_book_version, \
+    find_books, get_favorite_books_page, get_popular_books_page, get_book_facets
+from src.config import db_settings
+from src.db.database import engine, replicas, pool_status
+from src.responses import FastJSONResponse
+from src.user.service import get_user_by_email, get_user_principal
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT_SECONDS = 2
+WARM_UP_RETRY_SECONDS = 5
+SAMPLE_BOOK = {"id": 0, "title": "Warm-up", "description": None, "authors": ["Warm Up"], "genres": ["Warm-up"]}
+
+warmed_up = asyncio.Event()
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+async def _warm_queries(connection: AsyncConnection) -> None:
+    # Running the real service functions fills SQLAlchemy's compiled cache and asyncpg's per-connection
+    # prepared statement cache with exactly the statements requests will use.
+    async with AsyncSession(bind=connection) as session:
+        for warm in (
+            lambda: get_all_books(20, 0, session),
+            lambda: get_books_page(20, None, session),
+            lambda: get_book_by_id(0, session, BookLoading.AGGREGATED),
+            lambda: get_book_version(0, session),
+            lambda: find_books("warm up", 20, session),
+            lambda: get_book_facets(None, session),
+            lambda: get_favorite_books_page(0, 20, None, session),
+            lambda: get_popular_books_page(20, None, session),
+            lambda: get_user_principal(0, session),
+            lambda: get_user_by_email("", session),
+        ):
+            try:
+                await warm()
+            except HTTPException:
+                pass
+
+
+async def _prefill(target: AsyncEngine) -> None:
+    results = await asyncio.gather(*(target.connect() for _ in range(target.pool.size())), return_exceptions=True)
+    connections = [result for result in results if isinstance(result, AsyncConnection)]
+    try:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        await asyncio.gather(*(_warm_queries(connection) for connection in connections))
+    finally:
+        await asyncio.gather(*(connection.close() for connection in connections))
+
+
+def _warm_serializers(app: FastAPI) -> None:
+    BookResponse.model_validate(SAMPLE_BOOK).model_dump()
+    CreateBookSchema.model_validate(SAMPLE_BOOK)
+    FastJSONResponse([SAMPLE_BOOK])
+    app.openapi()
+
+
+async def warm_up(app: FastAPI) -> None:
+    _warm_serializers(app)
+    # Starts the hash pool thread and argon2's first allocation of its memory cost.
+    await verify_password("warm-up", await get_password_hash("warm-up"))
+
+    while True:
+        try:
+            await _prefill(engine)
+            break
+        except (DBAPIError, OSError) as exc:
+            logger.warning("Warm-up could not reach the database, retrying in %ss: %s", WARM_UP_RETRY_SECONDS, exc)
+            await asyncio.sleep(WARM_UP_RETRY_SECONDS)
+    for replica in replicas.engines:
+        # Replicas are optional; an unreachable one is skipped by the replica set anyway.
+        try:
+            await _prefill(replica)
+        except (DBAPIError, OSError) as exc:
+            logger.warning("Warm-up skipped replica %s: %s", replica.url.render_as_string(hide_password=True), exc)
+    warmed_up.set()
+
+
+@router.get("/live")
+async def live() -> dict:
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready() -> JSONResponse:
+    if not warmed_up.is_set():
+        return JSONResponse({"status": "warming_up"}, status_code=503)
+
+    status = pool_status(engine)
+    if status["checked_out"] >= status["size"] + db_settings.DB_MAX_OVERFLOW:
+        return JSONResponse({"status": "pool_exhausted", "pool": status}, status_code=503)
+
+    try:
+        async with asyncio.timeout(PROBE_TIMEOUT_SECONDS):
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+    except (DBAPIError, OSError, TimeoutError):
+        return JSONResponse({"status": "database_unreachable"}, status_code=503)
+    return JSONResponse({"status": "ready"})
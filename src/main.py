@@ -1,12 +1,82 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from src.auth.router import router as auth_router
 from src.book.router import router as book_router
+from src.config import metrics_settings
+from src.db.database import engine, replicas
+from src.db.router import router as db_router
+from src.health import router as health_router, warm_up
+from src.metrics import router as metrics_router, RequestStats, request_stats, route_metrics, UNMATCHED_ROUTE
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so /health/live answers at once while /health/ready reports warming_up.
+    warm_up_task = asyncio.create_task(warm_up(app))
+    yield
+    warm_up_task.cancel()
+    await engine.dispose()
+    for replica in replicas.engines:
+        await replica.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(router=auth_router)
 app.include_router(router=book_router)
+app.include_router(router=db_router)
+app.include_router(router=metrics_router)
+app.include_router(router=health_router)
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    stats = RequestStats()
+    token = request_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        request_stats.reset(token)
+        elapsed = time.perf_counter() - started
+        # Label by route template, not raw path, so /api/books/1 and /api/books/2 share one series.
+        route = getattr(request.scope.get("route"), "path", UNMATCHED_ROUTE)
+        route_metrics.observe(request.method, route, status, elapsed, stats)
+        if elapsed * 1000 >= metrics_settings.SLOW_REQUEST_MS:
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "route": route,
+                "path": request.url.path,
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "db_statements": stats.statements,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "pool_wait_ms": round(stats.pool_wait * 1000, 2),
+                "slowest_statement_ms": round(stats.slowest_time * 1000, 2),
+                "slowest_statement": stats.slowest_statement,
+            }))
+
+    if metrics_settings.SERVER_TIMING:
+        # Streaming responses keep querying after the headers are sent; only the work done up to here is reported.
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.2f};desc="statements={stats.statements}", '
+            f"pool;dur={stats.pool_wait * 1000:.2f}, "
+            f"app;dur={elapsed * 1000:.2f}"
+        )
+    return response
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, port=3000, reload=True)
+    # Development only: reload needs an import string. Production runs through `python -m src.server`.
+    uvicorn.run("src.main:app", port=3000, reload=True)
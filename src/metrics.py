@@ -0,0 +1,146 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_STATEMENT_LENGTH = 300
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+
+    def record_statement(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.db_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = " ".join(statement.split())[:MAX_STATEMENT_LENGTH]
+
+
+# Set per request by the middleware; engine and pool hooks run in the request's context (SQLAlchemy's
+# greenlets inherit it), so they can attribute their timings without any plumbing through the services.
+request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def record_pool_wait(wait: float) -> None:
+    stats = request_stats.get()
+    if stats is not None:
+        stats.pool_wait += wait
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.record_statement(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", _handle_error)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.statements: dict[tuple[str, str], int] = {}
+        self.db_time: dict[tuple[str, str], float] = {}
+        self.pool_wait: dict[tuple[str, str], float] = {}
+
+    def observe(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats) -> None:
+        key = (method, route)
+        self.latency.setdefault(key, Histogram()).observe(elapsed)
+        self.requests[(method, route, str(status))] = self.requests.get((method, route, str(status)), 0) + 1
+        self.statements[key] = self.statements.get(key, 0) + stats.statements
+        self.db_time[key] = self.db_time.get(key, 0.0) + stats.db_time
+        self.pool_wait[key] = self.pool_wait.get(key, 0.0) + stats.pool_wait
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in sorted(self.latency.items()):
+            for bound, count in histogram.cumulative():
+                lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} "
+                             f"{count}")
+            lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} "
+                         f"{histogram.count}")
+
+        lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+        for name, help_text, values in (
+            ("db_statements_total", "Statements executed by route.", self.statements),
+            ("db_time_seconds_total", "Time spent executing statements by route.", self.db_time),
+            ("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection by route.", self.pool_wait),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), value in sorted(values.items()):
+                lines.append(f"{name}{_labels(method=method, route=route)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+route_metrics = RouteMetrics()
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(route_metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,90 @@
+import importlib.util
+import os
+import sys
+
+import uvicorn
+
+from src.config import server_settings, db_settings, cache_settings, rate_limit_settings
+
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+
+
+def available_cpus() -> int:
+    cpus = os.process_cpu_count() or 1
+    # Containers limited by a CPU quota still see every core of the node.
+    try:
+        with open(CGROUP_CPU_MAX) as file:
+            quota, period = file.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_count() -> int:
+    return server_settings.WEB_CONCURRENCY or available_cpus()
+
+
+def pool_limits(workers: int) -> tuple[int, int]:
+    pool_size, max_overflow = db_settings.DB_POOL_SIZE, db_settings.DB_MAX_OVERFLOW
+    if not server_settings.DB_MAX_CONNECTIONS:
+        return pool_size, max_overflow
+    per_worker = server_settings.DB_MAX_CONNECTIONS // workers
+    if per_worker < 1:
+        raise SystemExit(f"DB_MAX_CONNECTIONS={server_settings.DB_MAX_CONNECTIONS} cannot give each of "
+                         f"{workers} workers a connection; lower WEB_CONCURRENCY.")
+    pool_size = min(pool_size, per_worker)
+    return pool_size, min(max_overflow, per_worker - pool_size)
+
+
+def _resolve(setting: str, preferred: str, fallback: str) -> str:
+    if setting != "auto":
+        return setting
+    return preferred if importlib.util.find_spec(preferred) else fallback
+
+
+def per_worker_state(workers: int) -> list[str]:
+    state = []
+    if cache_settings.CACHE_BACKEND == "memory":
+        state.append("CACHE_BACKEND=memory: a book write only invalidates the cached responses and ETags of the worker "
+                     "that handled it, the others serve stale bodies for up to CACHE_TTL_SECONDS; token revocations "
+                     "also only reach that worker")
+    if rate_limit_settings.RATE_LIMIT_BACKEND == "memory":
+        state.append(f"RATE_LIMIT_BACKEND=memory: every worker keeps its own buckets, so a client gets up to {workers}x "
+                     f"the configured limits")
+    return state
+
+
+def main() -> None:
+    workers = worker_count()
+    pool_size, max_overflow = pool_limits(workers)
+    # Workers are separate processes that read their settings from the environment on import.
+    os.environ["DB_POOL_SIZE"] = str(pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = str(max_overflow)
+    loop = _resolve(server_settings.SERVER_LOOP, "uvloop", "asyncio")
+    http = _resolve(server_settings.SERVER_HTTP, "httptools", "h11")
+    # With a single worker uvicorn runs the server without a supervisor, so reaching the request limit would
+    # stop the app instead of replacing the worker.
+    max_requests = server_settings.WORKER_MAX_REQUESTS if workers > 1 else 0
+
+    if workers > 1:
+        for state in per_worker_state(workers):
+            print(f"WARNING: {workers} workers with per-process state. {state}. Use the redis backend or "
+                  f"WEB_CONCURRENCY=1.", file=sys.stderr)
+    print(f"Starting {workers} workers (loop={loop}, http={http}), DB pool {pool_size}+{max_overflow} per worker, "
+          f"recycling after {max_requests or 'unlimited'} requests")
+    uvicorn.run(
+        "src.main:app",
+        host=server_settings.SERVER_HOST,
+        port=server_settings.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=server_settings.GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
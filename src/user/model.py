@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Integer, String, Enum, Table, Column, ForeignKey
+from sqlalchemy import Integer, String, Enum, Table, Column, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.book.model import Book
@@ -16,7 +16,8 @@ user_books = Table(
     Column("book_id",
            Integer,
            ForeignKey("books.id", ondelete="CASCADE"),
-           primary_key=True))
+           primary_key=True),
+    Index("ix_user_books_book_id", "book_id"))
 
 
 class UserRole(str, enum.Enum):
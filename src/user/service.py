@@ -1,8 +1,8 @@
 from fastapi import HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from src.auth.model import Principal
 from src.auth.security import get_password_hash, verify_password
 from src.user.model import User
 from src.user.schema import UserCreateSchema
@@ -16,7 +16,7 @@ async def create_user(user_dto: UserCreateSchema, db: AsyncSession) -> User:
                             detail="User with this email already exists.")
 
     user_dict = user_dto.model_dump()
-    user_dict['password'] = get_password_hash(user_dto.password)
+    user_dict['password'] = await get_password_hash(user_dto.password)
     user = User(**user_dict)
 
     db.add(user)
@@ -34,7 +34,7 @@ async def get_user_by_email(email: str, db: AsyncSession) -> User:
 
 
 async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
-    query = select(User).where(User.id == user_id).options(selectinload(User.favorite_books))
+    query = select(User).where(User.id == user_id)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
     if not user:
@@ -42,10 +42,19 @@ async def get_user_by_id(user_id: int, db: AsyncSession) -> User:
     return user
 
 
+async def get_user_principal(user_id: int, db: AsyncSession) -> Principal | None:
+    query = select(User.id, User.role).where(User.id == user_id)
+    result = await db.execute(query)
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return Principal(id=row.id, role=row.role)
+
+
 async def authenticate_user(email: str, password: str, db: AsyncSession) -> User | None:
     user = await get_user_by_email(email, db)
     if not user:
         return None
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         return None
     return user
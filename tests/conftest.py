@@ -0,0 +1,23 @@
+import os
+
+# Settings are read on import; tests never reach the database, so any values do.
+for name, value in {
+    "DB_USER": "library", "DB_PASS": "library", "DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "library",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "15", "ACCESS_TOKEN_SECRET": "access-secret",
+    "REFRESH_TOKEN_EXPIRE_DAYS": "7", "REFRESH_TOKEN_SECRET": "refresh-secret",
+}.items():
+    os.environ.setdefault(name, value)
+
+import pytest
+
+from tests.fakes import FakeClock, FakeRedis
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def redis() -> FakeRedis:
+    return FakeRedis()
@@ -0,0 +1,121 @@
+import time
+
+from lupa import LuaRuntime
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+# In-process stand-in for the subset of the redis.asyncio client used by SharedCache and SharedRateLimiter.
+# Scripts passed to eval run in a real Lua interpreter, so the token bucket tested is the one Redis runs.
+class FakeRedis:
+    def __init__(self):
+        self._data: dict[str, tuple[bytes | dict[str, bytes], float | None]] = {}
+        self._lua = LuaRuntime(unpack_returned_tuples=True)
+        self.commands = 0
+
+    def _get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    async def get(self, key: str) -> bytes | None:
+        self.commands += 1
+        return self._get(key)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        self.commands += 1
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value, ex: int | None = None) -> None:
+        self.commands += 1
+        self._data[key] = (self._encode(value), time.monotonic() + ex if ex else None)
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    async def delete(self, *keys: str) -> None:
+        self.commands += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        self.commands += 1
+        value = int(self._get(key) or 0) + 1
+        self._data[key] = (str(value).encode(), None)
+        return value
+
+    def _call(self, command: str, key: str, *args):
+        command = command.upper()
+        if command == "HMGET":
+            fields = self._get(key) or {}
+            # Redis hands missing values to Lua as false.
+            return self._lua.table(*[fields[field].decode() if field in fields else False for field in args])
+        if command == "HSET":
+            fields = dict(self._get(key) or {})
+            fields.update({args[i]: self._encode(args[i + 1]) for i in range(0, len(args), 2)})
+            expires_at = self._data[key][1] if key in self._data else None
+            self._data[key] = (fields, expires_at)
+            return len(args) // 2
+        if command == "EXPIRE":
+            if key not in self._data:
+                return 0
+            self._data[key] = (self._data[key][0], time.monotonic() + args[0])
+            return 1
+        raise NotImplementedError(command)
+
+    async def eval(self, script: str, numkeys: int, *keys_and_args):
+        self.commands += 1
+        # Like Redis, arguments reach the script as strings.
+        keys = self._lua.table(*[str(key) for key in keys_and_args[:numkeys]])
+        argv = self._lua.table(*[str(arg) for arg in keys_and_args[numkeys:]])
+        redis = self._lua.table_from({"call": self._call})
+        run = self._lua.eval("function(script, KEYS, ARGV, redis) "
+                             "return load(script, 'script', 't', {KEYS = KEYS, ARGV = ARGV, redis = redis, "
+                             "math = math, tonumber = tonumber, tostring = tostring})() end")
+        result = run(script, keys, argv, redis)
+        return result.encode() if isinstance(result, str) else result
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self._queued: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._queued.clear()
+
+    def set(self, *args, **kwargs) -> "FakePipeline":
+        self._queued.append(("set", args, kwargs))
+        return self
+
+    async def execute(self) -> list:
+        # Every queued command goes out in a single round trip.
+        commands = self.client.commands
+        results = [await getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self._queued]
+        self.client.commands = commands + 1
+        self._queued.clear()
+        return results
@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.book import cache as book_cache
+from src.book.cache import cache_key, cache_keys, get_cached, get_cached_many, set_cached, set_cached_many, \
+    get_or_load, invalidate_books
+from src.cache import MemoryCache, SharedCache, response_cache
+from src.db.database import PINNED_TO_PRIMARY, FROM_REPLICA
+
+
+def session(**info) -> SimpleNamespace:
+    return SimpleNamespace(info=info)
+
+
+@pytest.fixture(params=["memory", "shared"])
+def backend(request, redis, monkeypatch):
+    backend = MemoryCache(100) if request.param == "memory" else SharedCache(redis)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    monkeypatch.setattr(response_cache, "hits", 0)
+    monkeypatch.setattr(response_cache, "misses", 0)
+    return backend
+
+
+def test_miss_then_hit(backend):
+    async def scenario():
+        key = await cache_key("book", 1)
+        assert await get_cached(key, session()) is None
+        await set_cached(key, {"id": 1, "title": "Dune"}, session())
+        assert await get_cached(key, session()) == {"id": 1, "title": "Dune"}
+
+    asyncio.run(scenario())
+    assert (response_cache.hits, response_cache.misses) == (1, 1)
+
+
+def test_get_or_load_loads_once(backend):
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        return [1, 2, 3]
+
+    async def scenario():
+        key = await cache_key("books", 10, 0)
+        return [await get_or_load(key, loader, session()) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [[1, 2, 3]] * 3
+    assert len(loads) == 1
+
+
+def test_batch_keys_match_single_keys(backend):
+    async def scenario():
+        return await cache_keys("book", [(1,), (2,)]), [await cache_key("book", 1), await cache_key("book", 2)]
+
+    batch, single = asyncio.run(scenario())
+    assert batch == single
+
+
+def test_batch_miss_then_hit(backend):
+    async def scenario():
+        keys = await cache_keys("book", [(1,), (2,), (3,)])
+        first = await get_cached_many(keys, session())
+        await set_cached_many({keys[0]: {"id": 1}, keys[2]: {"id": 3}}, session())
+        return first, await get_cached_many(keys, session())
+
+    assert asyncio.run(scenario()) == ([None, None, None], [{"id": 1}, None, {"id": 3}])
+    assert (response_cache.hits, response_cache.misses) == (2, 4)
+
+
+def test_shared_batch_is_one_round_trip_each_way(redis, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", SharedCache(redis))
+    keys = [f"books:0:book:{book_id}" for book_id in range(100)]
+
+    async def scenario():
+        await get_cached_many(keys, session())
+        reads = redis.commands
+        await set_cached_many({key: {"id": 1} for key in keys}, session())
+        return reads, redis.commands - reads
+
+    assert asyncio.run(scenario()) == (1, 1)
+
+
+def test_invalidation_changes_every_key(backend):
+    async def scenario():
+        key = await cache_key("book", 1)
+        await set_cached(key, {"title": "Old"}, session())
+        await invalidate_books()
+        new_key = await cache_key("book", 1)
+        return key, new_key, await get_cached(new_key, session())
+
+    key, new_key, value = asyncio.run(scenario())
+    assert key != new_key
+    assert value is None
+
+
+def test_pinned_session_bypasses_cache(backend):
+    async def scenario():
+        key = await cache_key("book", 1)
+        await set_cached(key, {"title": "Cached"}, session())
+        pinned = session(**{PINNED_TO_PRIMARY: True})
+        await set_cached(await cache_key("book", 2), {"title": "Fresh"}, pinned)
+        return await get_cached(key, pinned), await get_cached(await cache_key("book", 2), session())
+
+    assert asyncio.run(scenario()) == (None, None)
+
+
+def test_replica_read_after_write_is_not_cached(backend, monkeypatch):
+    monkeypatch.setattr(book_cache.db_settings, "DB_REPLICA_URLS", "postgresql+asyncpg://replica/library")
+
+    async def scenario():
+        await invalidate_books()
+        key = await cache_key("book", 1)
+        await set_cached(key, {"title": "Maybe stale"}, session(**{FROM_REPLICA: True}))
+        stale = await get_cached(key, session())
+        await set_cached(key, {"title": "Primary"}, session())
+        return stale, await get_cached(key, session())
+
+    assert asyncio.run(scenario()) == (None, {"title": "Primary"})
+
+
+def test_shared_generation_is_seen_by_every_process(redis, monkeypatch):
+    # Two workers sharing one Redis: a write handled by one invalidates what the other cached.
+    first, second = SharedCache(redis), SharedCache(redis)
+
+    async def scenario():
+        monkeypatch.setattr(response_cache, "backend", first)
+        key = await cache_key("book", 1)
+        await set_cached(key, {"title": "Old"}, session())
+        monkeypatch.setattr(response_cache, "backend", second)
+        await invalidate_books()
+        monkeypatch.setattr(response_cache, "backend", first)
+        return await get_cached(await cache_key("book", 1), session())
+
+    assert asyncio.run(scenario()) is None
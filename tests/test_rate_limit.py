@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from src.auth import rate_limit
+from src.auth.rate_limit import MemoryRateLimiter, SharedRateLimiter
+
+CAPACITY = 3
+PER_MINUTE = 6
+
+
+@pytest.fixture(params=["memory", "shared"])
+def limiter(request, redis, clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return MemoryRateLimiter(100) if request.param == "memory" else SharedRateLimiter(redis)
+
+
+def take(limiter, key: str = "login:ip:1.2.3.4") -> float:
+    return asyncio.run(limiter.take(key, CAPACITY, PER_MINUTE / 60))
+
+
+def test_allows_a_burst_then_denies(limiter):
+    assert [take(limiter) for _ in range(CAPACITY)] == [0.0] * CAPACITY
+    # One token every 10 seconds.
+    assert take(limiter) == pytest.approx(10.0)
+
+
+def test_refills_over_time(limiter, clock):
+    for _ in range(CAPACITY):
+        take(limiter)
+    clock.advance(4)
+    assert take(limiter) == pytest.approx(6.0)
+    clock.advance(6)
+    assert take(limiter) == 0.0
+    assert take(limiter) > 0
+
+
+def test_never_refills_past_capacity(limiter, clock):
+    take(limiter)
+    clock.advance(3600)
+    assert [take(limiter) for _ in range(CAPACITY)] == [0.0] * CAPACITY
+    assert take(limiter) > 0
+
+
+def test_buckets_are_independent(limiter):
+    for _ in range(CAPACITY):
+        take(limiter, "login:ip:1.2.3.4")
+    assert take(limiter, "login:ip:5.6.7.8") == 0.0
+
+
+def test_shared_bucket_is_seen_by_every_process(redis, clock, monkeypatch):
+    monkeypatch.setattr(rate_limit, "time", clock)
+    workers = [SharedRateLimiter(redis), SharedRateLimiter(redis), SharedRateLimiter(redis)]
+    assert [take(worker) for worker in workers] == [0.0] * CAPACITY
+    assert take(SharedRateLimiter(redis)) > 0
+
+
+def test_denied_request_gets_retry_after(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limit_backend", limiter)
+    monkeypatch.setattr(rate_limit.rate_limit_settings, "RATE_LIMIT_IP_CAPACITY", CAPACITY)
+    monkeypatch.setattr(rate_limit.rate_limit_settings, "RATE_LIMIT_IP_PER_MINUTE", PER_MINUTE)
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(rate_limit.rate_limit("login"))])
+    async def login():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert [client.post("/login").status_code for _ in range(CAPACITY)] == [200] * CAPACITY
+    response = client.post("/login")
+    assert response.status_code == 429
+    assert response.json() == {"detail": rate_limit.RATE_LIMITED}
+    assert response.headers["Retry-After"] == "10"
+
+
+def test_email_bucket_limits_across_addresses(limiter, monkeypatch):
+    monkeypatch.setattr(rate_limit, "rate_limit_backend", limiter)
+    monkeypatch.setattr(rate_limit.rate_limit_settings, "RATE_LIMIT_IP_CAPACITY", 100)
+    monkeypatch.setattr(rate_limit.rate_limit_settings, "RATE_LIMIT_EMAIL_CAPACITY", 1)
+    monkeypatch.setattr(rate_limit.rate_limit_settings, "RATE_LIMIT_EMAIL_PER_MINUTE", 1)
+    app = FastAPI()
+
+    @app.post("/login", dependencies=[Depends(rate_limit.rate_limit("login", by_email=True))])
+    async def login():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/login", json={"email": "Reader@Example.com"}).status_code == 200
+    response = client.post("/login", json={"email": " reader@example.com "})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+    assert client.post("/login", json={"email": "other@example.com"}).status_code == 200